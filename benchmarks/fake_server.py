@@ -0,0 +1,426 @@
+"""Local stand-in for the SmartShopr ha-api endpoints.
+
+Serves generated lists, items, budgets and expenses with configurable
+latency, payload size and error rate, and counts the requests and bytes
+it sends. Changes are also pushed as events to clients connected to the
+events websocket. Run it standalone with
+
+    python -m benchmarks.fake_server --lists 15 --items 30 --latency 0.05
+
+and point API_BASE_URL at http://127.0.0.1:8787.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+import hashlib
+import json
+import random
+from typing import Any
+
+from aiohttp import web
+
+UNITS = [None, "g", "kg", "ml", "l", "pcs"]
+
+
+@dataclass
+class FakeServerConfig:
+    """Shape and behaviour of the fake backend."""
+
+    lists: int = 15
+    items_per_list: int = 30
+    budgets: int = 3
+    latency: float = 0.05  # Seconds added to every response
+    latency_jitter: float = 0.0  # Random extra seconds, up to this value
+    error_rate: float = 0.0  # Share of requests answered with 503
+    etags: bool = True  # Send ETags and answer 304 to matching requests
+    list_markers: bool = True  # Send updated_at and item_count per list
+    batch: bool = False  # Offer the items/batch write endpoint
+    snapshot: bool = False  # Offer the composite snapshot endpoint
+    pagination: bool = True  # Page items when a limit is requested
+    completion_times: bool = False  # Send when completed items were completed
+    seed: int = 0
+
+
+@dataclass
+class FakeServerStats:
+    """Counters of what the fake backend served."""
+
+    requests: int = 0
+    not_modified: int = 0
+    errors: int = 0
+    bytes_sent: int = 0
+    largest_response: int = 0
+    events_sent: int = 0
+    by_endpoint: dict[str, int] = field(default_factory=dict)
+
+    def reset(self) -> None:
+        """Reset all counters."""
+        self.requests = self.not_modified = self.errors = self.bytes_sent = 0
+        self.largest_response = self.events_sent = 0
+        self.by_endpoint = {}
+
+
+def _set_completed(item: dict[str, Any], completed: bool, days_ago: float = 0) -> None:
+    """Complete or reopen an item, with its completion time if it has one."""
+    item["is_completed"] = completed
+    if "completed_at" in item:
+        item["completed_at"] = (
+            (datetime.now(timezone.utc) - timedelta(days=days_ago)).isoformat()
+            if completed
+            else None
+        )
+
+
+def _update_item(item: dict[str, Any], data: dict[str, Any]) -> None:
+    """Apply the writable fields of an update to an item."""
+    item.update(
+        {key: value for key, value in data.items() if key in ("name", "quantity_value")}
+    )
+    if "is_completed" in data and data["is_completed"] != item["is_completed"]:
+        _set_completed(item, data["is_completed"])
+
+
+class FakeSmartShoprBackend:
+    """In-memory SmartShopr data served over aiohttp."""
+
+    def __init__(self, config: FakeServerConfig) -> None:
+        """Generate the data set."""
+        self.config = config
+        self.stats = FakeServerStats()
+        self._random = random.Random(config.seed)
+        self._next_id = 0
+        self._subscribers: set[web.WebSocketResponse] = set()
+        self._send_tasks: set[asyncio.Task] = set()
+        self.lists: dict[str, dict[str, Any]] = {}
+        self.items: dict[str, list[dict[str, Any]]] = {}
+        for list_index in range(config.lists):
+            list_id = f"list-{list_index}"
+            self.lists[list_id] = {
+                "id": list_id,
+                "name": f"List {list_index}",
+                "shared": list_index % 3 == 0,
+                "version": 1,
+            }
+            self.items[list_id] = [
+                self._new_item(list_id, f"Item {item_index}")
+                for item_index in range(config.items_per_list)
+            ]
+        self.budgets = [
+            {
+                "id": f"budget-{index}",
+                "name": f"Budget {index}",
+                "target_amount": 300.0,
+                "spent": 120.0 + index,
+                "remaining": 180.0 - index,
+                "expense_count": 12,
+                "shared": False,
+            }
+            for index in range(config.budgets)
+        ]
+        self.expenses = {
+            "month": "2026-10",
+            "totals": {"EUR": 412.35},
+            "expense_count": 37,
+        }
+
+    def _new_item(
+        self, list_id: str, name: str, quantity: int | None = None
+    ) -> dict[str, Any]:
+        """Create a new item."""
+        self._next_id += 1
+        item = {
+            "id": f"item-{self._next_id}",
+            "list_id": list_id,
+            "name": name,
+            "quantity_value": (
+                quantity if quantity is not None else self._random.randint(1, 4)
+            ),
+            "quantity_unit": self._random.choice(UNITS),
+            "is_completed": self._random.random() < 0.3,
+        }
+        if self.config.completion_times:
+            item["completed_at"] = None
+            if item["is_completed"]:
+                # Completed some time during the last year
+                _set_completed(item, True, self._random.uniform(0, 365))
+        return item
+
+    def touch(self, list_id: str) -> None:
+        """Mark a list as changed."""
+        self.lists[list_id]["version"] += 1
+
+    def publish(self, event: dict[str, Any]) -> None:
+        """Send an event to every connected events websocket."""
+        message = json.dumps(event)
+        for websocket in self._subscribers:
+            self.stats.events_sent += 1
+            task = asyncio.ensure_future(websocket.send_str(message))
+            self._send_tasks.add(task)
+            task.add_done_callback(self._send_tasks.discard)
+
+    def _item_updated(self, list_id: str, item: dict[str, Any]) -> None:
+        """Mark a list as changed and publish the new item."""
+        self.touch(list_id)
+        self.publish({"type": "item_updated", "list_id": list_id, "item": dict(item)})
+
+    def _item_deleted(self, list_id: str, item_id: str) -> None:
+        """Mark a list as changed and publish the deletion."""
+        self.touch(list_id)
+        self.publish({"type": "item_deleted", "list_id": list_id, "item_id": item_id})
+
+    def change_random_item(self) -> str:
+        """Toggle a random item, as another app user would."""
+        list_id = self._random.choice(list(self.items))
+        if self.items[list_id]:
+            item = self._random.choice(self.items[list_id])
+            _set_completed(item, not item["is_completed"])
+            self._item_updated(list_id, item)
+        else:
+            self.touch(list_id)
+        return list_id
+
+    def _list_payload(self, list_id: str) -> dict[str, Any]:
+        """Return a list as sent by the lists endpoint."""
+        shopping_list = self.lists[list_id]
+        payload = {
+            "id": list_id,
+            "name": shopping_list["name"],
+            "shared": shopping_list["shared"],
+        }
+        if self.config.list_markers:
+            payload["updated_at"] = f"v{shopping_list['version']}"
+            payload["item_count"] = len(self.items[list_id])
+        return payload
+
+    def _find_item(self, item_id: str) -> tuple[str, dict[str, Any]]:
+        """Return the list id and the item with the given id."""
+        for list_id, items in self.items.items():
+            for item in items:
+                if item["id"] == item_id:
+                    return list_id, item
+        raise web.HTTPNotFound(
+            text=json.dumps({"error": "Item not found"}),
+            content_type="application/json",
+        )
+
+    async def _respond(
+        self, request: web.Request, endpoint: str, payload: dict[str, Any]
+    ) -> web.Response:
+        """Send a JSON payload, honouring the configured behaviour."""
+        self.stats.requests += 1
+        self.stats.by_endpoint[endpoint] = self.stats.by_endpoint.get(endpoint, 0) + 1
+        delay = self.config.latency + self._random.uniform(0, self.config.latency_jitter)
+        if delay:
+            await asyncio.sleep(delay)
+        if self._random.random() < self.config.error_rate:
+            self.stats.errors += 1
+            return web.Response(status=503)
+
+        body = json.dumps(payload).encode()
+        headers = {}
+        if self.config.etags and request.method == "GET":
+            etag = f'"{hashlib.blake2b(body, digest_size=8).hexdigest()}"'
+            if request.headers.get("If-None-Match") == etag:
+                self.stats.not_modified += 1
+                return web.Response(status=304, headers={"ETag": etag})
+            headers["ETag"] = etag
+        self.stats.bytes_sent += len(body)
+        self.stats.largest_response = max(self.stats.largest_response, len(body))
+        return web.Response(body=body, content_type="application/json", headers=headers)
+
+    async def get_lists(self, request: web.Request) -> web.Response:
+        """Handle GET lists."""
+        return await self._respond(
+            request,
+            "lists",
+            {"lists": [self._list_payload(list_id) for list_id in self.lists]},
+        )
+
+    async def get_items(self, request: web.Request) -> web.Response:
+        """Handle GET lists/{id}/items."""
+        list_id = request.match_info["list_id"]
+        if list_id not in self.items:
+            raise web.HTTPNotFound()
+        items = self.items[list_id]
+        if (since := request.query.get("completed_since")) is not None:
+            items = [
+                item
+                for item in items
+                if not item["is_completed"]
+                or item.get("completed_at") is None
+                or item["completed_at"] >= since
+            ]
+        if not self.config.pagination or "limit" not in request.query:
+            return await self._respond(request, "lists/{id}/items", {"items": items})
+        # The cursor is the offset of the page
+        offset = int(request.query.get("cursor", 0))
+        end = offset + int(request.query["limit"])
+        payload: dict[str, Any] = {"items": items[offset:end]}
+        if end < len(items):
+            payload["next_cursor"] = str(end)
+        return await self._respond(request, "lists/{id}/items", payload)
+
+    async def add_item(self, request: web.Request) -> web.Response:
+        """Handle POST lists/{id}/items."""
+        list_id = request.match_info["list_id"]
+        data = await request.json()
+        item = self._new_item(list_id, data["name"], data.get("quantity_value", 1))
+        item["is_completed"] = False
+        if data.get("quantity_unit"):
+            item["quantity_unit"] = data["quantity_unit"]
+        self.items[list_id].append(item)
+        self._item_updated(list_id, item)
+        return await self._respond(request, "lists/{id}/items", {"item": item})
+
+    async def update_item(self, request: web.Request) -> web.Response:
+        """Handle PATCH items/{id}."""
+        list_id, item = self._find_item(request.match_info["item_id"])
+        data = await request.json()
+        _update_item(item, data)
+        self._item_updated(list_id, item)
+        return await self._respond(request, "items/{id}", {"item": item})
+
+    async def delete_item(self, request: web.Request) -> web.Response:
+        """Handle DELETE items/{id}."""
+        list_id, item = self._find_item(request.match_info["item_id"])
+        self.items[list_id].remove(item)
+        self._item_deleted(list_id, item["id"])
+        return await self._respond(request, "items/{id}", {"success": True})
+
+    async def batch(self, request: web.Request) -> web.Response:
+        """Handle POST items/batch."""
+        if not self.config.batch:
+            raise web.HTTPNotFound(
+                text=json.dumps({"error": "Not found"}),
+                content_type="application/json",
+            )
+        data = await request.json()
+        results = []
+        for item_id in data.get("delete", []):
+            try:
+                list_id, item = self._find_item(item_id)
+            except web.HTTPNotFound:
+                results.append({"id": item_id, "success": False, "error": "Item not found"})
+                continue
+            self.items[list_id].remove(item)
+            self._item_deleted(list_id, item_id)
+            results.append({"id": item_id, "success": True})
+        for update in data.get("update", []):
+            try:
+                list_id, item = self._find_item(update["id"])
+            except web.HTTPNotFound:
+                results.append(
+                    {"id": update["id"], "success": False, "error": "Item not found"}
+                )
+                continue
+            _update_item(item, update)
+            self._item_updated(list_id, item)
+            results.append({"id": update["id"], "success": True, "item": item})
+        return await self._respond(request, "items/batch", {"results": results})
+
+    async def get_snapshot(self, request: web.Request) -> web.Response:
+        """Handle GET snapshot."""
+        if not self.config.snapshot:
+            raise web.HTTPNotFound(
+                text=json.dumps({"error": "Not found"}),
+                content_type="application/json",
+            )
+        return await self._respond(
+            request,
+            "snapshot",
+            {
+                "lists": [
+                    {**self._list_payload(list_id), "items": self.items[list_id]}
+                    for list_id in self.lists
+                ],
+                "budgets": self.budgets,
+                "expenses": self.expenses,
+            },
+        )
+
+    async def get_budgets(self, request: web.Request) -> web.Response:
+        """Handle GET budgets."""
+        return await self._respond(request, "budgets", {"budgets": self.budgets})
+
+    async def get_expenses(self, request: web.Request) -> web.Response:
+        """Handle GET expenses/month."""
+        return await self._respond(request, "expenses/month", self.expenses)
+
+    async def events(self, request: web.Request) -> web.WebSocketResponse:
+        """Handle the events websocket."""
+        websocket = web.WebSocketResponse(heartbeat=30)
+        await websocket.prepare(request)
+        self._subscribers.add(websocket)
+        try:
+            async for _message in websocket:
+                pass
+        finally:
+            self._subscribers.discard(websocket)
+        return websocket
+
+    def create_app(self) -> web.Application:
+        """Create the aiohttp application."""
+        app = web.Application()
+        app.router.add_get("/snapshot", self.get_snapshot)
+        app.router.add_get("/lists", self.get_lists)
+        app.router.add_get("/lists/{list_id}/items", self.get_items)
+        app.router.add_post("/lists/{list_id}/items", self.add_item)
+        app.router.add_post("/items/batch", self.batch)
+        app.router.add_patch("/items/{item_id}", self.update_item)
+        app.router.add_delete("/items/{item_id}", self.delete_item)
+        app.router.add_get("/budgets", self.get_budgets)
+        app.router.add_get("/expenses/month", self.get_expenses)
+        app.router.add_get("/events", self.events)
+        return app
+
+
+async def start_server(
+    backend: FakeSmartShoprBackend, host: str = "127.0.0.1", port: int = 0
+) -> tuple[web.AppRunner, str]:
+    """Start serving the backend and return the runner and base URL."""
+    runner = web.AppRunner(backend.create_app())
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    bound_port = runner.addresses[0][1]
+    return runner, f"http://{host}:{bound_port}"
+
+
+def main() -> None:
+    """Run the fake backend until interrupted."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8787)
+    parser.add_argument("--lists", type=int, default=15)
+    parser.add_argument("--items", type=int, default=30)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--no-etags", action="store_true")
+    parser.add_argument("--no-markers", action="store_true")
+    parser.add_argument("--batch", action="store_true")
+    parser.add_argument("--snapshot", action="store_true")
+    parser.add_argument("--no-pagination", action="store_true")
+    parser.add_argument("--completion-times", action="store_true")
+    args = parser.parse_args()
+
+    backend = FakeSmartShoprBackend(
+        FakeServerConfig(
+            lists=args.lists,
+            items_per_list=args.items,
+            latency=args.latency,
+            error_rate=args.error_rate,
+            etags=not args.no_etags,
+            list_markers=not args.no_markers,
+            batch=args.batch,
+            snapshot=args.snapshot,
+            pagination=not args.no_pagination,
+            completion_times=args.completion_times,
+        )
+    )
+    web.run_app(backend.create_app(), host="127.0.0.1", port=args.port)
+
+
+if __name__ == "__main__":
+    main()
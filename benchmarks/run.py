@@ -0,0 +1,358 @@
+"""Benchmark the SmartShopr refresh and write paths against the fake backend.
+
+Needs Home Assistant installed. Run from the repository root:
+
+    python -m benchmarks.run                 # print results
+    python -m benchmarks.run --save          # update benchmarks/baselines.json
+    python -m benchmarks.run --compare       # fail on regressions
+    python -m benchmarks.run --snapshot      # serve the snapshot endpoint
+    python -m benchmarks.run --completed-max-age 30  # skip old completed items
+    python -m benchmarks.run --runs 5        # median of 5 runs per scenario
+
+For every scenario the coordinators are refreshed against a local fake
+backend and the following are recorded:
+
+- wall time and request count of a cold refresh, an unchanged refresh
+  and a refresh after one remote change
+- bytes and time decoded by the client, and the largest response
+- time to build the entity state of all todo lists and sensors
+- acknowledge and send time of single and bulk todo writes
+
+Every scenario is run several times and the median of each metric is
+reported, so a single slow run does not count as a regression.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+from collections.abc import Awaitable, Callable
+import json
+import logging
+from pathlib import Path
+import statistics
+import sys
+import tempfile
+import time
+from typing import Any
+from unittest.mock import patch
+
+import aiohttp
+
+from homeassistant.components.todo import TodoItem, TodoItemStatus
+from homeassistant.core import HomeAssistant
+
+from custom_components.smartshopr import api
+from custom_components.smartshopr.api import SmartShoprApiClient
+from custom_components.smartshopr.coordinator import (
+    SmartShoprFinanceCoordinator,
+    SmartShoprListsCoordinator,
+)
+from custom_components.smartshopr.sensor import (
+    SmartShoprBudgetSensor,
+    SmartShoprMonthlyExpensesSensor,
+)
+from custom_components.smartshopr.todo import SmartShoprTodoListEntity
+from custom_components.smartshopr.write_queue import SmartShoprWriteQueue
+
+from .fake_server import FakeServerConfig, FakeSmartShoprBackend, start_server
+
+BASELINE_FILE = Path(__file__).parent / "baselines.json"
+
+# Scenario name -> (lists, items per list)
+SCENARIOS: dict[str, tuple[int, int]] = {
+    "1x10": (1, 10),
+    "15x30": (15, 30),
+    "50x100": (50, 100),
+    "200x50": (200, 50),
+    "1x5000": (1, 5000),
+}
+
+# Most items deleted by the bulk delete benchmark
+BULK_DELETE_MAX = 100
+
+# Runs of every scenario, the median of each metric is reported
+DEFAULT_RUNS = 3
+
+# Allowed slowdown against the baseline before a metric counts as a regression
+TIME_TOLERANCE = 1.5
+
+# Slowdowns below this (in seconds) are timer noise, whatever the ratio
+TIME_SLACK = 0.02
+
+
+async def _timed(func: Callable[[], Awaitable[Any]]) -> float:
+    """Return the wall time of awaiting func()."""
+    start = time.perf_counter()
+    await func()
+    return time.perf_counter() - start
+
+
+class _Measurement:
+    """Request and byte counters between two points in time."""
+
+    def __init__(self, backend: FakeSmartShoprBackend) -> None:
+        self._backend = backend
+
+    def __enter__(self) -> _Measurement:
+        self._backend.stats.reset()
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        stats = self._backend.stats
+        self.requests = stats.requests
+        self.not_modified = stats.not_modified
+        self.bytes = stats.bytes_sent
+        self.largest_response = stats.largest_response
+
+
+async def _refresh(
+    lists: SmartShoprListsCoordinator, finance: SmartShoprFinanceCoordinator
+) -> None:
+    """Refresh both coordinators like a poll cycle would."""
+    await asyncio.gather(lists.async_refresh(), finance.async_refresh())
+    if not (lists.last_update_success and finance.last_update_success):
+        raise RuntimeError("Refresh failed")
+
+
+def _state_build_time(
+    lists: SmartShoprListsCoordinator, finance: SmartShoprFinanceCoordinator
+) -> float:
+    """Return the time to build the state of every entity once."""
+    entities: list[Any] = [
+        SmartShoprTodoListEntity(
+            lists, shopping_list.id, shopping_list.name, False
+        )
+        for shopping_list in lists.data["lists"]
+    ]
+    sensors: list[Any] = [SmartShoprMonthlyExpensesSensor(finance)] + [
+        SmartShoprBudgetSensor(finance, budget.id, budget.name)
+        for budget in finance.data["budgets"]
+    ]
+    start = time.perf_counter()
+    for entity in entities:
+        items = entity.todo_items
+        sum(1 for item in items if item.status == TodoItemStatus.NEEDS_ACTION)
+    for sensor in sensors:
+        sensor.native_value  # pylint: disable=pointless-statement
+        sensor.extra_state_attributes  # pylint: disable=pointless-statement
+        sensor.icon  # pylint: disable=pointless-statement
+    return time.perf_counter() - start
+
+
+async def run_scenario(
+    hass: HomeAssistant,
+    session: aiohttp.ClientSession,
+    list_count: int,
+    items_per_list: int,
+    latency: float,
+    snapshot: bool = False,
+    completed_max_age: int = 0,
+) -> dict[str, Any]:
+    """Run one scenario and return its metrics."""
+    backend = FakeSmartShoprBackend(
+        FakeServerConfig(
+            lists=list_count,
+            items_per_list=items_per_list,
+            latency=latency,
+            snapshot=snapshot,
+            completion_times=completed_max_age > 0,
+        )
+    )
+    runner, base_url = await start_server(backend)
+    result: dict[str, Any] = {}
+    try:
+        with patch.object(api, "API_BASE_URL", base_url):
+            client = SmartShoprApiClient("sk_live_benchmark", session)
+            lists = SmartShoprListsCoordinator(
+                hass, client, completed_max_age=completed_max_age
+            )
+            finance = SmartShoprFinanceCoordinator(hass, client)
+            lists.finance = finance
+            write_queue = SmartShoprWriteQueue(
+                hass, f"benchmark_{list_count}x{items_per_list}", client, lists
+            )
+            lists.write_queue = write_queue
+
+            for name, prepare in (
+                ("cold_refresh", None),
+                ("unchanged_refresh", None),
+                ("one_change_refresh", backend.change_random_item),
+            ):
+                if prepare is not None:
+                    prepare()
+                decode_time_before = client.metrics.decode_time
+                with _Measurement(backend) as measured:
+                    wall = await _timed(lambda: _refresh(lists, finance))
+                decode_time = client.metrics.decode_time
+                result[name] = {
+                    "wall_time": wall,
+                    "requests": measured.requests,
+                    "not_modified": measured.not_modified,
+                    "bytes_decoded": measured.bytes,
+                    "largest_response": measured.largest_response,
+                    "decode_time": decode_time - decode_time_before,
+                }
+
+            result["state_build_time"] = _state_build_time(lists, finance)
+
+            first_list = lists.data["lists"][0]
+            entity = SmartShoprTodoListEntity(
+                lists, first_list.id, first_list.name, False
+            )
+            # Deleting thousands of items one by one only measures latency
+            item_ids = [item.id for item in first_list.items[:BULK_DELETE_MAX]]
+            with _Measurement(backend) as measured:
+                ack = await _timed(
+                    lambda: entity.async_update_todo_item(
+                        TodoItem(uid=item_ids[0], status=TodoItemStatus.COMPLETED)
+                    )
+                )
+                wall = ack + await _timed(write_queue.async_drain)
+            result["update_item"] = {
+                "ack_time": ack,
+                "wall_time": wall,
+                "requests": measured.requests,
+            }
+            with _Measurement(backend) as measured:
+                ack = await _timed(lambda: entity.async_delete_todo_items(item_ids))
+                wall = ack + await _timed(write_queue.async_drain)
+            result["bulk_delete"] = {
+                "ack_time": ack,
+                "wall_time": wall,
+                "requests": measured.requests,
+                "items": len(item_ids),
+            }
+
+            write_queue.async_shutdown()
+
+            await lists.async_shutdown()
+            await finance.async_shutdown()
+    finally:
+        await runner.cleanup()
+    return result
+
+
+def _median(runs: list[dict[str, Any]]) -> dict[str, Any]:
+    """Return the median of every metric over several runs."""
+    result: dict[str, Any] = {}
+    for name, value in runs[0].items():
+        values = [run[name] for run in runs]
+        if isinstance(value, dict):
+            result[name] = _median(values)
+        else:
+            result[name] = statistics.median(values)
+    return result
+
+
+def compare(baseline: dict[str, Any], results: dict[str, Any]) -> list[str]:
+    """Return a description of every regression against the baseline."""
+    regressions = []
+    for scenario, metrics in results["scenarios"].items():
+        base_metrics = baseline.get("scenarios", {}).get(scenario)
+        if base_metrics is None:
+            continue
+        for name, value in metrics.items():
+            base_value = base_metrics.get(name)
+            if isinstance(value, dict) and isinstance(base_value, dict):
+                pairs = [
+                    (f"{name}.{key}", value[key], base_value.get(key))
+                    for key in value
+                ]
+            else:
+                pairs = [(name, value, base_value)]
+            for label, current, base in pairs:
+                if base is None:
+                    continue
+                if label.endswith("time"):
+                    if (
+                        current > base * TIME_TOLERANCE
+                        and current - base > TIME_SLACK
+                    ):
+                        regressions.append(
+                            f"{scenario} {label}: {current:.4f}s (baseline {base:.4f}s)"
+                        )
+                elif current > base:
+                    regressions.append(
+                        f"{scenario} {label}: {current} (baseline {base})"
+                    )
+    return regressions
+
+
+async def async_main(args: argparse.Namespace) -> int:
+    """Run the selected scenarios."""
+    logging.basicConfig(level=logging.WARNING)
+    with tempfile.TemporaryDirectory() as config_dir:
+        hass = HomeAssistant(config_dir)
+        results: dict[str, Any] = {
+            "latency": args.latency,
+            "snapshot": args.snapshot,
+            "completed_max_age": args.completed_max_age,
+            "runs": args.runs,
+            "scenarios": {},
+        }
+        async with aiohttp.ClientSession() as session:
+            for name in args.scenario or SCENARIOS:
+                list_count, items_per_list = SCENARIOS[name]
+                print(f"Running {name} ...", file=sys.stderr)
+                runs = [
+                    await run_scenario(
+                        hass,
+                        session,
+                        list_count,
+                        items_per_list,
+                        args.latency,
+                        args.snapshot,
+                        args.completed_max_age,
+                    )
+                    for _ in range(args.runs)
+                ]
+                results["scenarios"][name] = _median(runs)
+        await hass.async_stop(force=True)
+
+    print(json.dumps(results, indent=2))
+
+    if args.save:
+        BASELINE_FILE.write_text(json.dumps(results, indent=2) + "\n")
+        print(f"Saved baseline to {BASELINE_FILE}", file=sys.stderr)
+
+    if args.compare:
+        baseline = json.loads(BASELINE_FILE.read_text())
+        if regressions := compare(baseline, results):
+            print("Regressions:\n  " + "\n  ".join(regressions), file=sys.stderr)
+            return 1
+        print("No regressions", file=sys.stderr)
+    return 0
+
+
+def main() -> None:
+    """Parse arguments and run the benchmarks."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenario", action="append", choices=list(SCENARIOS))
+    parser.add_argument(
+        "--latency", type=float, default=0.02, help="fake backend latency in seconds"
+    )
+    parser.add_argument(
+        "--snapshot",
+        action="store_true",
+        help="let the fake backend serve the composite snapshot endpoint",
+    )
+    parser.add_argument(
+        "--completed-max-age",
+        type=int,
+        default=0,
+        metavar="DAYS",
+        help="skip items completed more than DAYS ago",
+    )
+    parser.add_argument(
+        "--runs",
+        type=int,
+        default=DEFAULT_RUNS,
+        help="runs of every scenario, the median is reported",
+    )
+    parser.add_argument("--save", action="store_true", help="save as new baseline")
+    parser.add_argument("--compare", action="store_true", help="compare to baseline")
+    sys.exit(asyncio.run(async_main(parser.parse_args())))
+
+
+if __name__ == "__main__":
+    main()
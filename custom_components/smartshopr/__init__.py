@@ -1,43 +1,173 @@
 """SmartShopr integration for Home Assistant."""
 from __future__ import annotations
 
+import asyncio
 import logging
 from typing import Any
 
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import CONF_API_KEY, Platform
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers import config_validation as cv
 from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.helpers.typing import ConfigType
 
 from .api import SmartShoprApiClient
-from .const import DOMAIN
-from .coordinator import SmartShoprDataUpdateCoordinator
+from .const import (
+    CONF_COMPLETED_MAX_AGE,
+    CONF_MAX_SCAN_INTERVAL,
+    CONF_MIN_SCAN_INTERVAL,
+    CONF_PUSH_UPDATES,
+    DATA_SHARED_LISTS,
+    DEFAULT_COMPLETED_MAX_AGE,
+    DEFAULT_MAX_SCAN_INTERVAL,
+    DEFAULT_MIN_SCAN_INTERVAL,
+    DOMAIN,
+)
+from .coordinator import (
+    SmartShoprData,
+    SmartShoprFinanceCoordinator,
+    SmartShoprListsCoordinator,
+    build_finance_snapshot,
+)
+from .expense_statistics import SmartShoprStatistics, async_remove_statistics
+from .hub import SmartShoprSharedListHub
+from .models import Budget, MonthlyExpenses, ShoppingList
+from .push import SmartShoprPushListener
+from .services import async_setup_services
+from .store import SmartShoprSnapshotStore
+from .write_queue import SmartShoprWriteQueue, async_remove_write_queue
 
 _LOGGER = logging.getLogger(__name__)
 
 PLATFORMS: list[Platform] = [Platform.TODO, Platform.SENSOR]
 
+CONFIG_SCHEMA = cv.config_entry_only_config_schema(DOMAIN)
+
+
+async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
+    """Set up the SmartShopr services."""
+    async_setup_services(hass)
+    return True
+
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Set up SmartShopr from a config entry."""
     api_key = entry.data[CONF_API_KEY]
     session = async_get_clientsession(hass)
     client = SmartShoprApiClient(api_key, session)
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    if DATA_SHARED_LISTS not in domain_data:
+        domain_data[DATA_SHARED_LISTS] = SmartShoprSharedListHub()
+
+    lists_coordinator = SmartShoprListsCoordinator(
+        hass,
+        client,
+        min_interval=entry.options.get(
+            CONF_MIN_SCAN_INTERVAL, DEFAULT_MIN_SCAN_INTERVAL
+        ),
+        max_interval=entry.options.get(
+            CONF_MAX_SCAN_INTERVAL, DEFAULT_MAX_SCAN_INTERVAL
+        ),
+        shared_lists=domain_data[DATA_SHARED_LISTS],
+        completed_max_age=entry.options.get(
+            CONF_COMPLETED_MAX_AGE, DEFAULT_COMPLETED_MAX_AGE
+        ),
+    )
+    finance_coordinator = SmartShoprFinanceCoordinator(hass, client)
+    lists_coordinator.finance = finance_coordinator
+
+    # Follows the finance data from the start, restored data included
+    statistics = SmartShoprStatistics(hass, entry.entry_id, finance_coordinator)
+    await statistics.async_load()
+    statistics.async_start(entry)
+
+    # Load todo writes not sent before the restart, before the first refresh
+    write_queue = SmartShoprWriteQueue(hass, entry.entry_id, client, lists_coordinator)
+    await write_queue.async_load()
+    lists_coordinator.write_queue = write_queue
+    entry.async_on_unload(write_queue.async_shutdown)
+
+    store = SmartShoprSnapshotStore(hass, entry.entry_id)
+    snapshot = await store.async_load()
+    if snapshot and "lists" in snapshot and "budgets" in snapshot:
+        # Start from the last known data and refresh in the background
+        lists_coordinator.async_restore(
+            [
+                ShoppingList.from_dict(shopping_list)
+                for shopping_list in snapshot["lists"]
+            ],
+            snapshot.get("list_markers", {}),
+        )
+        finance_coordinator.async_set_updated_data(
+            build_finance_snapshot(
+                [Budget.from_dict(budget) for budget in snapshot["budgets"]],
+                MonthlyExpenses.from_dict(snapshot["expenses"]),
+            )
+        )
+        for coordinator in (lists_coordinator, finance_coordinator):
+            entry.async_create_background_task(
+                hass, coordinator.async_refresh(), f"{coordinator.name} refresh"
+            )
+    else:
+        await asyncio.gather(
+            lists_coordinator.async_config_entry_first_refresh(),
+            finance_coordinator.async_config_entry_first_refresh(),
+        )
 
-    coordinator = SmartShoprDataUpdateCoordinator(hass, client)
-    await coordinator.async_config_entry_first_refresh()
+    data = SmartShoprData(
+        client=client,
+        lists=lists_coordinator,
+        finance=finance_coordinator,
+        write_queue=write_queue,
+        statistics=statistics,
+    )
+    domain_data[entry.entry_id] = data
+    write_queue.async_schedule_replay()
 
-    hass.data.setdefault(DOMAIN, {})
-    hass.data[DOMAIN][entry.entry_id] = coordinator
+    if entry.options.get(CONF_PUSH_UPDATES, False):
+        data.push = SmartShoprPushListener(hass, client, lists_coordinator)
+        data.push.async_start(entry)
+
+    @callback
+    def _async_save_snapshot() -> None:
+        """Persist the data after successful refreshes."""
+        if (
+            lists_coordinator.last_update_success
+            and finance_coordinator.last_update_success
+        ):
+            store.async_schedule_save(data)
+
+    for coordinator in (lists_coordinator, finance_coordinator):
+        entry.async_on_unload(coordinator.async_add_listener(_async_save_snapshot))
+    _async_save_snapshot()
 
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
 
+    entry.async_on_unload(entry.add_update_listener(async_reload_entry))
+
     return True
 
 
+async def async_reload_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Reload the config entry when its options change."""
+    await hass.config_entries.async_reload(entry.entry_id)
+
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry."""
     if unload_ok := await hass.config_entries.async_unload_platforms(entry, PLATFORMS):
-        hass.data[DOMAIN].pop(entry.entry_id)
+        domain_data = hass.data[DOMAIN]
+        domain_data.pop(entry.entry_id)
+        if domain_data.keys() == {DATA_SHARED_LISTS}:
+            # Last entry unloaded, drop the shared list items
+            domain_data.pop(DATA_SHARED_LISTS)
 
     return unload_ok
+
+
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Remove the persisted data of a removed config entry."""
+    await SmartShoprSnapshotStore(hass, entry.entry_id).async_remove()
+    await async_remove_write_queue(hass, entry.entry_id)
+    await async_remove_statistics(hass, entry.entry_id)
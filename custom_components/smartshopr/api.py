@@ -2,15 +2,53 @@
 from __future__ import annotations
 
 import asyncio
+from collections.abc import AsyncIterator, Awaitable, Callable
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+from functools import partial
 import logging
-from typing import Any
+import time
+from typing import Any, TypeVar
+from urllib.parse import urlencode
 
 import aiohttp
 
-from .const import API_BASE_URL
+from homeassistant.util import dt as dt_util
+
+from .const import (
+    API_BASE_URL,
+    BREAKER_FAILURE_THRESHOLD,
+    BREAKER_RESET_TIMEOUT,
+    EVENTS_ENDPOINT,
+    ITEMS_PAGE_SIZE,
+    MAX_CONCURRENT_WRITES,
+    MAX_RETRY_AFTER,
+    PUSH_HEARTBEAT,
+    RATE_LIMIT,
+    RATE_LIMIT_BURST,
+    RATE_LIMIT_HOLD,
+    REQUEST_TIMEOUT,
+    RETRY_ATTEMPTS,
+    RETRY_BACKOFF,
+    SNAPSHOT_ENDPOINT,
+)
+from .decoder import DECODER, async_decode_json
+from .metrics import RequestMetrics
+from .models import (
+    Budget,
+    ItemsPage,
+    ListItem,
+    MonthlyExpenses,
+    ShoppingList,
+    Snapshot,
+    parse_item,
+)
+from .resilience import CircuitBreaker, SharedTasks, TokenBucket
 
 _LOGGER = logging.getLogger(__name__)
 
+_T = TypeVar("_T")
+
 
 class SmartShoprApiError(Exception):
     """Exception for SmartShopr API errors."""
@@ -20,6 +58,68 @@ class SmartShoprAuthError(SmartShoprApiError):
     """Exception for authentication errors."""
 
 
+class SmartShoprRequestError(SmartShoprApiError):
+    """Exception for requests the server rejected with a 4xx status."""
+
+    def __init__(self, message: str, status: int | None = None) -> None:
+        """Initialize the error."""
+        super().__init__(message)
+        self.status = status
+
+
+class SmartShoprNotFoundError(SmartShoprRequestError):
+    """Exception for missing resources or endpoints."""
+
+
+class SmartShoprConnectionError(SmartShoprApiError):
+    """Exception for timeouts, connection and server errors."""
+
+
+class SmartShoprRateLimitError(SmartShoprApiError):
+    """Exception for requests rejected by the server's rate limit."""
+
+    def __init__(self, message: str, retry_after: float | None) -> None:
+        """Initialize the error."""
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class SmartShoprCircuitOpenError(SmartShoprApiError):
+    """Exception for requests not sent because the API keeps failing."""
+
+
+def _items_page_key(list_id: str, page_number: int) -> str:
+    """Return the cache key of a page of the items of a list."""
+    return f"lists/{list_id}/items#{page_number}"
+
+
+def _items_page_list_id(cache_key: str) -> str | None:
+    """Return the list of an item page cache key, None for other keys."""
+    path, _, page_number = cache_key.partition("#")
+    parts = path.split("/")
+    if page_number and len(parts) == 3 and parts[0] == "lists" and parts[2] == "items":
+        return parts[1]
+    return None
+
+
+def _parse_retry_after(value: str | None) -> float | None:
+    """Return the delay in seconds requested by a Retry-After header."""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        # Dates with a -0000 zone are parsed without one, they are in UTC
+        retry_at = retry_at.replace(tzinfo=dt_util.UTC)
+    return max((retry_at - dt_util.utcnow()).total_seconds(), 0.0)
+
+
 class SmartShoprApiClient:
     """Client for SmartShopr API."""
 
@@ -31,45 +131,275 @@ class SmartShoprApiClient:
             "Authorization": f"Bearer {api_key}",
             "Content-Type": "application/json",
         }
+        # Validators (ETag, Last-Modified) and parsed models by cache key
+        self._validators: dict[str, tuple[str | None, str | None, Any]] = {}
+        self.cache_hits = 0
+        self.cache_misses = 0
+        # Whether the server has a batch write endpoint, None until known
+        self._batch_supported: bool | None = None
+        # Whether the server has the snapshot endpoint, None until known
+        self._snapshot_supported: bool | None = None
+        self._write_semaphore = asyncio.Semaphore(MAX_CONCURRENT_WRITES)
+        self._rate_limiter = TokenBucket(RATE_LIMIT, RATE_LIMIT_BURST, RATE_LIMIT_HOLD)
+        self.breaker = CircuitBreaker(BREAKER_FAILURE_THRESHOLD, BREAKER_RESET_TIMEOUT)
+        self.retry_count = 0
+        self.rate_limited_count = 0
+        self.metrics = RequestMetrics()
+        # GET requests in flight by endpoint, shared by identical requests
+        self._inflight_gets: SharedTasks[Any] = SharedTasks()
+        self.deduplicated_requests = 0
 
     async def _request(
         self,
         method: str,
         endpoint: str,
         data: dict[str, Any] | None = None,
-    ) -> dict[str, Any]:
-        """Make an API request."""
+        idempotency_key: str | None = None,
+        cache_key: str | None = None,
+        parse: Callable[[dict[str, Any]], Any] | None = None,
+    ) -> Any:
+        """Make an API request.
+
+        Concurrent GET requests for the same endpoint share a single
+        request and its result, cancelled once all callers were. GET payloads are parsed with parse, the
+        models are kept with the validators of the response by cache_key,
+        the endpoint if not given.
+        """
+        if method != "GET":
+            return await self._request_with_retries(
+                method, endpoint, data, idempotency_key
+            )
+
+        if endpoint in self._inflight_gets:
+            self.deduplicated_requests += 1
+        return await self._inflight_gets.async_run(
+            endpoint,
+            partial(
+                self._request_with_retries,
+                method,
+                endpoint,
+                data,
+                cache_key=cache_key,
+                parse=parse,
+            ),
+        )
+
+    async def _request_with_retries(
+        self,
+        method: str,
+        endpoint: str,
+        data: dict[str, Any] | None = None,
+        idempotency_key: str | None = None,
+        cache_key: str | None = None,
+        parse: Callable[[dict[str, Any]], Any] | None = None,
+    ) -> Any:
+        """Make an API request, retrying where it is safe.
+
+        GET requests, and writes sent with an idempotency key, are retried
+        with exponential backoff after timeouts, connection and server
+        errors. Requests rejected with 429 are retried after the delay the
+        server asks for.
+        """
+        attempts = (
+            RETRY_ATTEMPTS if method == "GET" or idempotency_key is not None else 1
+        )
+        attempt = 0
+        while True:
+            if not self.breaker.allow_request():
+                raise SmartShoprCircuitOpenError(
+                    "SmartShopr API is failing, requests are paused"
+                )
+            await self._rate_limiter.acquire()
+            try:
+                result = await self._request_once(
+                    method, endpoint, data, idempotency_key, cache_key, parse
+                )
+            except SmartShoprRateLimitError as err:
+                self.breaker.record_success()
+                self.rate_limited_count += 1
+                self._rate_limiter.engage()
+                delay = err.retry_after
+                if delay is None:
+                    delay = RETRY_BACKOFF * 2**attempt
+                if attempt + 1 >= RETRY_ATTEMPTS or delay > MAX_RETRY_AFTER:
+                    raise
+            except SmartShoprConnectionError:
+                self.breaker.record_failure()
+                if attempt + 1 >= attempts:
+                    raise
+                delay = RETRY_BACKOFF * 2**attempt
+            except SmartShoprApiError:
+                # The backend answered, the request itself was rejected
+                self.breaker.record_success()
+                raise
+            except BaseException:
+                # Unexpected errors and cancellation end a trial request too
+                self.breaker.record_failure()
+                raise
+            else:
+                self.breaker.record_success()
+                return result
+
+            attempt += 1
+            self.retry_count += 1
+            _LOGGER.debug(
+                "Retrying %s %s in %.1fs (attempt %d)", method, endpoint, delay, attempt + 1
+            )
+            await asyncio.sleep(delay)
+
+    async def _request_once(
+        self,
+        method: str,
+        endpoint: str,
+        data: dict[str, Any] | None = None,
+        idempotency_key: str | None = None,
+        cache_key: str | None = None,
+        parse: Callable[[dict[str, Any]], Any] | None = None,
+    ) -> Any:
+        """Make a single API request."""
         url = f"{API_BASE_URL}/{endpoint}"
+        cache_key = cache_key or endpoint
+        cached = self._validators.get(cache_key) if method == "GET" else None
+        write_headers = self._headers
+        if idempotency_key is not None:
+            write_headers = {**self._headers, "Idempotency-Key": idempotency_key}
+        start = time.monotonic()
+        self.metrics.record_request(endpoint)
 
         try:
-            async with asyncio.timeout(10):
+            async with asyncio.timeout(REQUEST_TIMEOUT):
                 if method == "GET":
-                    response = await self._session.get(url, headers=self._headers)
+                    headers = self._headers
+                    if cached is not None:
+                        etag, last_modified, _ = cached
+                        headers = dict(self._headers)
+                        if etag:
+                            headers["If-None-Match"] = etag
+                        if last_modified:
+                            headers["If-Modified-Since"] = last_modified
+                    response = await self._session.get(url, headers=headers)
                 elif method == "POST":
-                    response = await self._session.post(url, headers=self._headers, json=data)
+                    response = await self._session.post(url, headers=write_headers, json=data)
                 elif method == "PATCH":
-                    response = await self._session.patch(url, headers=self._headers, json=data)
+                    response = await self._session.patch(url, headers=write_headers, json=data)
                 elif method == "DELETE":
-                    response = await self._session.delete(url, headers=self._headers)
+                    response = await self._session.delete(url, headers=write_headers)
                 else:
                     raise SmartShoprApiError(f"Unknown method: {method}")
 
+                if response.status >= 300:
+                    self.metrics.record_response(
+                        endpoint, response.status, time.monotonic() - start, 0
+                    )
+
+                if response.status == 304 and cached is not None:
+                    # Unchanged, reuse the models parsed last time
+                    response.release()
+                    self.cache_hits += 1
+                    return cached[2]
+
                 if response.status == 401:
                     raise SmartShoprAuthError("Invalid API key")
 
                 if response.status == 403:
-                    raise SmartShoprApiError("Access denied")
+                    raise SmartShoprRequestError("Access denied", 403)
+
+                if response.status == 404:
+                    raise SmartShoprNotFoundError(f"Not found: {endpoint}", 404)
+
+                if response.status == 429:
+                    response.release()
+                    raise SmartShoprRateLimitError(
+                        "Rate limit exceeded",
+                        _parse_retry_after(response.headers.get("Retry-After")),
+                    )
+
+                if response.status >= 500:
+                    response.release()
+                    raise SmartShoprConnectionError(f"Server error {response.status}")
 
                 if response.status >= 400:
-                    error_data = await response.json()
-                    raise SmartShoprApiError(error_data.get("error", "Unknown error"))
+                    try:
+                        error_data = await response.json()
+                    except (aiohttp.ContentTypeError, ValueError):
+                        error_data = {}
+                    raise SmartShoprRequestError(
+                        error_data.get("error", "Unknown error"), response.status
+                    )
+
+                body = await response.read()
+                self.metrics.record_response(
+                    endpoint, response.status, time.monotonic() - start, len(body)
+                )
+                try:
+                    result, decode_time, in_executor = await async_decode_json(body)
+                except ValueError as err:
+                    raise SmartShoprApiError("Invalid response from API") from err
+                self.metrics.record_decode(endpoint, decode_time, in_executor)
 
-                return await response.json()
+                if method == "GET":
+                    if parse is not None:
+                        result = parse(result)
+                    self._store_validators(cache_key, response, result)
+
+                return result
 
         except asyncio.TimeoutError as err:
-            raise SmartShoprApiError("Request timeout") from err
+            self.metrics.record_timeout(endpoint)
+            raise SmartShoprConnectionError("Request timeout") from err
         except aiohttp.ClientError as err:
-            raise SmartShoprApiError(f"Connection error: {err}") from err
+            self.metrics.record_connection_error(endpoint)
+            raise SmartShoprConnectionError(f"Connection error: {err}") from err
+
+    def as_diagnostics(self) -> dict[str, Any]:
+        """Return request statistics for diagnostics."""
+        return {
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+            "retry_count": self.retry_count,
+            "rate_limited_count": self.rate_limited_count,
+            "rate_limit_active": self._rate_limiter.active,
+            "rate_limit_tokens": round(self._rate_limiter.tokens, 2),
+            "circuit_breaker": self.breaker.as_dict(),
+            "batch_supported": self._batch_supported,
+            "snapshot_supported": self._snapshot_supported,
+            "deduplicated_requests": self.deduplicated_requests,
+            "json_decoder": DECODER,
+            "requests": self.metrics.as_dict(),
+        }
+
+    def _store_validators(
+        self,
+        cache_key: str,
+        response: aiohttp.ClientResponse,
+        result: Any,
+    ) -> None:
+        """Remember the validators of a GET response for the next request."""
+        self.cache_misses += 1
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if etag or last_modified:
+            self._validators[cache_key] = (etag, last_modified, result)
+        else:
+            self._validators.pop(cache_key, None)
+
+    def _forget(self, cache_key: str) -> bool:
+        """Drop a cached response, return False if there was none."""
+        return self._validators.pop(cache_key, None) is not None
+
+    async def _get(
+        self,
+        endpoint: str,
+        parse: Callable[[dict[str, Any]], _T],
+        cache_key: str | None = None,
+    ) -> _T:
+        """Fetch an endpoint and parse the payload into models.
+
+        While the server answers 304 the models parsed last time are
+        returned, so unchanged data is neither decoded nor parsed again.
+        Only the models are kept, not the payload they were parsed from.
+        """
+        return await self._request("GET", endpoint, cache_key=cache_key, parse=parse)
 
     async def validate_api_key(self) -> bool:
         """Validate the API key by fetching lists."""
@@ -82,16 +412,83 @@ class SmartShoprApiClient:
             # Other errors might be temporary, key might still be valid
             return True
 
+    async def get_snapshot(self) -> Snapshot | None:
+        """Get all lists with their items, budgets and expenses at once.
+
+        Returns None if the server has no snapshot endpoint. That is found
+        out by the first call and remembered, callers then fetch the
+        endpoints one by one. Servers answer unknown routes with 404, 400
+        or 405, any of them on the first call means no snapshot endpoint.
+        """
+        if self._snapshot_supported is False:
+            return None
+        try:
+            snapshot = await self._get(SNAPSHOT_ENDPOINT, Snapshot.from_dict)
+        except SmartShoprRequestError as err:
+            if self._snapshot_supported and not isinstance(
+                err, SmartShoprNotFoundError
+            ):
+                raise
+            _LOGGER.debug("No snapshot endpoint, fetching endpoints one by one")
+            self._snapshot_supported = False
+            return None
+        self._snapshot_supported = True
+        return snapshot
+
     # Lists
-    async def get_lists(self) -> list[dict[str, Any]]:
-        """Get all shopping lists."""
-        result = await self._request("GET", "lists")
-        return result.get("lists", [])
+    async def get_lists(self) -> list[ShoppingList]:
+        """Get all shopping lists, without their items."""
+        return await self._get("lists", self._parse_lists)
+
+    def _parse_lists(self, result: dict[str, Any]) -> list[ShoppingList]:
+        """Parse the lists, and forget the item pages of deleted lists."""
+        lists = [
+            ShoppingList.from_dict(shopping_list)
+            for shopping_list in result.get("lists", [])
+        ]
+        list_ids = {shopping_list.id for shopping_list in lists}
+        for cache_key in list(self._validators):
+            if (list_id := _items_page_list_id(cache_key)) and list_id not in list_ids:
+                self._forget(cache_key)
+        return lists
+
+    async def iter_list_items(
+        self,
+        list_id: str,
+        page_size: int = ITEMS_PAGE_SIZE,
+        completed_since: datetime | None = None,
+    ) -> AsyncIterator[ListItem]:
+        """Yield the items of a shopping list, one page at a time.
+
+        Every page is requested with the cursor of the previous one, so
+        no response grows with the size of the list. Servers that do not
+        paginate send all items without a cursor. With completed_since
+        the server may leave out items completed before that time.
+        """
+        params: dict[str, Any] = {"limit": page_size}
+        if completed_since is not None:
+            params["completed_since"] = completed_since.isoformat()
+        page_number = 0
+        while True:
+            # Cached by position, the URL changes with completed_since
+            page: ItemsPage = await self._get(
+                f"lists/{list_id}/items?{urlencode(params)}",
+                ItemsPage.from_dict,
+                _items_page_key(list_id, page_number),
+            )
+            for item in page.items:
+                yield item
+            if page.next_cursor is None:
+                break
+            params["cursor"] = page.next_cursor
+            page_number += 1
+        # Pages the list had before it shrank
+        while self._forget(_items_page_key(list_id, page_number + 1)):
+            page_number += 1
 
-    async def get_list_items(self, list_id: str) -> list[dict[str, Any]]:
-        """Get items for a shopping list."""
-        result = await self._request("GET", f"lists/{list_id}/items")
-        return result.get("items", [])
+    async def get_list_items(self, list_id: str) -> tuple[ListItem, ...]:
+        """Get all items of a shopping list."""
+        return tuple([item async for item in self.iter_list_items(list_id)])
 
     async def add_item(
         self,
@@ -99,8 +496,13 @@ class SmartShoprApiClient:
         name: str,
         quantity_value: int = 1,
         quantity_unit: str | None = None,
-    ) -> dict[str, Any]:
-        """Add an item to a shopping list."""
+        idempotency_key: str | None = None,
+    ) -> ListItem | None:
+        """Add an item to a shopping list.
+
+        With an idempotency key the request is retried after connection
+        errors, the server creates the item only once.
+        """
         data = {
             "name": name,
             "quantity_value": quantity_value,
@@ -108,8 +510,10 @@ class SmartShoprApiClient:
         if quantity_unit:
             data["quantity_unit"] = quantity_unit
 
-        result = await self._request("POST", f"lists/{list_id}/items", data)
-        return result.get("item", {})
+        result = await self._request(
+            "POST", f"lists/{list_id}/items", data, idempotency_key
+        )
+        return parse_item(result.get("item"))
 
     async def update_item(
         self,
@@ -117,7 +521,7 @@ class SmartShoprApiClient:
         is_completed: bool | None = None,
         name: str | None = None,
         quantity_value: int | None = None,
-    ) -> dict[str, Any]:
+    ) -> ListItem | None:
         """Update an item."""
         data = {}
         if is_completed is not None:
@@ -128,20 +532,146 @@ class SmartShoprApiClient:
             data["quantity_value"] = quantity_value
 
         result = await self._request("PATCH", f"items/{item_id}", data)
-        return result.get("item", {})
+        return parse_item(result.get("item"))
 
     async def delete_item(self, item_id: str) -> bool:
         """Delete an item."""
         result = await self._request("DELETE", f"items/{item_id}")
         return result.get("success", False)
 
+    # Bulk writes
+    async def _batch(self, data: dict[str, Any]) -> dict[str, dict[str, Any]] | None:
+        """Send a batch write, or return None if the server cannot batch."""
+        if self._batch_supported is False:
+            return None
+        try:
+            result = await self._request("POST", "items/batch", data)
+        except SmartShoprRequestError as err:
+            # Like the snapshot, other rejections only count on the first call
+            if self._batch_supported and not isinstance(
+                err, SmartShoprNotFoundError
+            ):
+                raise
+            _LOGGER.debug("No batch endpoint, falling back to single requests")
+            self._batch_supported = False
+            return None
+        self._batch_supported = True
+        return {entry["id"]: entry for entry in result.get("results", [])}
+
+    async def _each(
+        self, keys: list[str], func: Callable[[str], Awaitable[Any]]
+    ) -> dict[str, Any]:
+        """Call func for every key with bounded concurrency.
+
+        Errors are returned as the outcome of their key.
+        """
+
+        async def _run(key: str) -> Any:
+            async with self._write_semaphore:
+                try:
+                    return await func(key)
+                except SmartShoprApiError as err:
+                    return err
+
+        outcomes = await asyncio.gather(*(_run(key) for key in keys))
+        return dict(zip(keys, outcomes))
+
+    async def delete_items(
+        self, item_ids: list[str]
+    ) -> dict[str, SmartShoprApiError | None]:
+        """Delete several items.
+
+        Returns None for every deleted item and the error for every item
+        that could not be deleted.
+        """
+        try:
+            results = await self._batch({"delete": item_ids})
+        except SmartShoprApiError as err:
+            return {item_id: err for item_id in item_ids}
+        if results is None:
+
+            async def _delete(item_id: str) -> SmartShoprApiError | None:
+                if await self.delete_item(item_id):
+                    return None
+                return SmartShoprApiError("Delete failed")
+
+            return await self._each(item_ids, _delete)
+
+        outcomes: dict[str, SmartShoprApiError | None] = {}
+        for item_id in item_ids:
+            entry = results.get(item_id)
+            if entry is not None and entry.get("success"):
+                outcomes[item_id] = None
+            else:
+                error = entry.get("error") if entry else None
+                outcomes[item_id] = SmartShoprApiError(error or "Delete failed")
+        return outcomes
+
+    async def update_items(
+        self, updates: dict[str, dict[str, Any]]
+    ) -> dict[str, ListItem | SmartShoprApiError | None]:
+        """Update several items.
+
+        Returns the updated item (None if the server did not send it back)
+        for every item that was updated and the error for every item that
+        could not be updated.
+        """
+        try:
+            results = await self._batch(
+                {
+                    "update": [
+                        {"id": item_id, **fields} for item_id, fields in updates.items()
+                    ]
+                }
+            )
+        except SmartShoprApiError as err:
+            return {item_id: err for item_id in updates}
+        if results is None:
+            return await self._each(
+                list(updates),
+                lambda item_id: self.update_item(item_id, **updates[item_id]),
+            )
+
+        outcomes: dict[str, ListItem | SmartShoprApiError | None] = {}
+        for item_id in updates:
+            entry = results.get(item_id)
+            if entry is not None and entry.get("success"):
+                outcomes[item_id] = parse_item(entry.get("item"))
+            else:
+                error = entry.get("error") if entry else None
+                outcomes[item_id] = SmartShoprApiError(error or "Update failed")
+        return outcomes
+
+    # Events
+    async def async_connect_events(self) -> aiohttp.ClientWebSocketResponse:
+        """Open the websocket that streams change events."""
+        try:
+            async with asyncio.timeout(REQUEST_TIMEOUT):
+                return await self._session.ws_connect(
+                    f"{API_BASE_URL}/{EVENTS_ENDPOINT}",
+                    headers={"Authorization": self._headers["Authorization"]},
+                    heartbeat=PUSH_HEARTBEAT,
+                )
+        except aiohttp.WSServerHandshakeError as err:
+            if err.status == 401:
+                raise SmartShoprAuthError("Invalid API key") from err
+            if err.status == 404:
+                raise SmartShoprNotFoundError(f"Not found: {EVENTS_ENDPOINT}") from err
+            raise SmartShoprConnectionError(f"Event stream refused: {err.status}") from err
+        except (TimeoutError, aiohttp.ClientError) as err:
+            raise SmartShoprConnectionError(f"Connection error: {err}") from err
+
     # Budgets
-    async def get_budgets(self) -> list[dict[str, Any]]:
+    async def get_budgets(self) -> list[Budget]:
         """Get all budgets."""
-        result = await self._request("GET", "budgets")
-        return result.get("budgets", [])
+        return await self._get(
+            "budgets",
+            lambda result: [
+                Budget.from_dict(budget) for budget in result.get("budgets", [])
+            ],
+        )
 
     # Expenses
-    async def get_monthly_expenses(self) -> dict[str, Any]:
+    async def get_monthly_expenses(self) -> MonthlyExpenses:
         """Get current month expenses."""
-        return await self._request("GET", "expenses/month")
+        return await self._get("expenses/month", MonthlyExpenses.from_dict)
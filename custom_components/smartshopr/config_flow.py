@@ -9,11 +9,23 @@ import voluptuous as vol
 
 from homeassistant import config_entries
 from homeassistant.const import CONF_API_KEY
+from homeassistant.core import callback
 from homeassistant.data_entry_flow import FlowResult
 from homeassistant.helpers.aiohttp_client import async_get_clientsession
 
 from .api import SmartShoprApiClient, SmartShoprAuthError, SmartShoprApiError
-from .const import DOMAIN
+from .const import (
+    CONF_COMPLETED_MAX_AGE,
+    CONF_MAX_SCAN_INTERVAL,
+    CONF_MERGE_DUPLICATES,
+    CONF_MIN_SCAN_INTERVAL,
+    CONF_PUSH_UPDATES,
+    DEFAULT_COMPLETED_MAX_AGE,
+    DEFAULT_MAX_SCAN_INTERVAL,
+    DEFAULT_MERGE_DUPLICATES,
+    DEFAULT_MIN_SCAN_INTERVAL,
+    DOMAIN,
+)
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -29,6 +41,14 @@ class SmartShoprConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
 
     VERSION = 1
 
+    @staticmethod
+    @callback
+    def async_get_options_flow(
+        config_entry: config_entries.ConfigEntry,
+    ) -> SmartShoprOptionsFlow:
+        """Get the options flow for this handler."""
+        return SmartShoprOptionsFlow(config_entry)
+
     async def async_step_user(
         self, user_input: dict[str, Any] | None = None
     ) -> FlowResult:
@@ -83,7 +103,48 @@ class SmartShoprOptionsFlow(config_entries.OptionsFlow):
         self, user_input: dict[str, Any] | None = None
     ) -> FlowResult:
         """Manage the options."""
+        errors: dict[str, str] = {}
+
         if user_input is not None:
-            return self.async_create_entry(title="", data=user_input)
+            if user_input[CONF_MIN_SCAN_INTERVAL] > user_input[CONF_MAX_SCAN_INTERVAL]:
+                errors["base"] = "invalid_interval"
+            else:
+                return self.async_create_entry(title="", data=user_input)
+
+        options = self.config_entry.options
+        data_schema = vol.Schema(
+            {
+                vol.Required(
+                    CONF_MIN_SCAN_INTERVAL,
+                    default=options.get(
+                        CONF_MIN_SCAN_INTERVAL, DEFAULT_MIN_SCAN_INTERVAL
+                    ),
+                ): vol.All(vol.Coerce(int), vol.Range(min=5, max=3600)),
+                vol.Required(
+                    CONF_MAX_SCAN_INTERVAL,
+                    default=options.get(
+                        CONF_MAX_SCAN_INTERVAL, DEFAULT_MAX_SCAN_INTERVAL
+                    ),
+                ): vol.All(vol.Coerce(int), vol.Range(min=5, max=3600)),
+                vol.Required(
+                    CONF_PUSH_UPDATES,
+                    default=options.get(CONF_PUSH_UPDATES, False),
+                ): bool,
+                vol.Required(
+                    CONF_MERGE_DUPLICATES,
+                    default=options.get(
+                        CONF_MERGE_DUPLICATES, DEFAULT_MERGE_DUPLICATES
+                    ),
+                ): bool,
+                vol.Required(
+                    CONF_COMPLETED_MAX_AGE,
+                    default=options.get(
+                        CONF_COMPLETED_MAX_AGE, DEFAULT_COMPLETED_MAX_AGE
+                    ),
+                ): vol.All(vol.Coerce(int), vol.Range(min=0, max=3650)),
+            }
+        )
 
-        return self.async_show_form(step_id="init")
+        return self.async_show_form(
+            step_id="init", data_schema=data_schema, errors=errors
+        )
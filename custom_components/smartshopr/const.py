@@ -2,12 +2,82 @@
 
 DOMAIN = "smartshopr"
 CONF_API_KEY = "api_key"
+CONF_MIN_SCAN_INTERVAL = "min_scan_interval"
+CONF_MAX_SCAN_INTERVAL = "max_scan_interval"
+CONF_PUSH_UPDATES = "push_updates"
+CONF_MERGE_DUPLICATES = "merge_duplicates"
+CONF_COMPLETED_MAX_AGE = "completed_max_age"
 
 # API Configuration
 API_BASE_URL = "https://bttooyefdbutcsxxzfcl.supabase.co/functions/v1/ha-api"
 
 # Update intervals (in seconds)
-SCAN_INTERVAL = 30  # Poll every 30 seconds
+SCAN_INTERVAL = 30  # Initial poll interval
+DEFAULT_MIN_SCAN_INTERVAL = 10  # Poll interval while data is changing
+DEFAULT_MAX_SCAN_INTERVAL = 300  # Poll interval after a long idle period
+IDLE_BACKOFF_FACTOR = 1.5  # Interval growth per refresh without changes
+ERROR_JITTER = 0.2  # Random spread of the interval after errors
+FINANCE_SCAN_INTERVAL = 300  # Budgets and monthly expenses change rarely
+
+# Persisted snapshot used to start without waiting for the API
+STORAGE_VERSION = 1
+SNAPSHOT_SAVE_DELAY = 60  # Seconds to collect refreshes into one write
+STATISTICS_SAVE_DELAY = 30  # Seconds to collect finance updates into one write
+
+# Request resilience
+REQUEST_TIMEOUT = 10  # Seconds per request attempt
+RETRY_ATTEMPTS = 3  # Attempts for idempotent GET requests
+RETRY_BACKOFF = 1.0  # Seconds before the first retry, doubled per retry
+MAX_RETRY_AFTER = 60  # Longest Retry-After (in seconds) waited for
+# Client-side rate limit, only applied after the server answered 429
+RATE_LIMIT = 10.0  # Requests per second, shared by reads and writes
+RATE_LIMIT_BURST = 20  # Requests that may be sent at once
+RATE_LIMIT_HOLD = 300  # Seconds the limit stays on after the last 429
+BREAKER_FAILURE_THRESHOLD = 5  # Consecutive failures that open the circuit
+BREAKER_RESET_TIMEOUT = 60  # Seconds before a trial request is let through
+
+# Response bodies larger than this (in bytes) are decoded in the executor
+JSON_EXECUTOR_THRESHOLD = 64 * 1024
+
+# Maximum number of API requests in flight during a refresh
+MAX_CONCURRENT_REQUESTS = 5
+
+# Maximum number of write requests in flight when no batch endpoint exists
+MAX_CONCURRENT_WRITES = 4
+
+# Seconds without new todo writes before they are sent, so quick
+# successive writes are merged
+WRITE_COALESCE_WINDOW = 0.3
+
+# Seconds before queued todo writes are sent again after a failure
+WRITE_QUEUE_RETRY_INTERVAL = 30
+
+# Adding an item that is already open on the list increases its quantity
+DEFAULT_MERGE_DUPLICATES = True
+
+# Items requested per page of a list
+ITEMS_PAGE_SIZE = 200
+
+# Days completed items are kept, 0 keeps all of them
+DEFAULT_COMPLETED_MAX_AGE = 0
+
+# Refetch all list items every N refreshes, even if no list looks changed
+FULL_SYNC_EVERY = 20
+
+# Lists with their items, budgets and expenses in one response, if offered
+SNAPSHOT_ENDPOINT = "snapshot"
+
+# Realtime change events, optional
+EVENTS_ENDPOINT = "events"  # Websocket next to the API endpoints
+PUSH_SAFETY_SCAN_INTERVAL = 900  # Poll interval while events are received
+PUSH_HEARTBEAT = 30  # Seconds between websocket pings
+PUSH_RECONNECT_DELAY = 1  # Seconds before the first reconnect, doubled per try
+PUSH_MAX_RECONNECT_DELAY = 300  # Longest delay between reconnects
+
+# Items of lists shared between config entries are fetched once
+DATA_SHARED_LISTS = "shared_lists"  # Key of the hub in hass.data[DOMAIN]
+SHARED_LIST_REUSE_WINDOW = 10  # Seconds to reuse items of lists without marker
+SHARED_LIST_CACHE_TTL = 3600  # Seconds before unused shared items are dropped
 
 # Platforms
 PLATFORMS = ["todo", "sensor"]
@@ -1,61 +1,586 @@
-"""DataUpdateCoordinator for SmartShopr."""
+"""DataUpdateCoordinators for SmartShopr."""
 from __future__ import annotations
 
-from datetime import timedelta
+from abc import abstractmethod
+import asyncio
+from collections.abc import Awaitable
+from dataclasses import dataclass, replace
+from datetime import datetime, timedelta
 import logging
-from typing import Any
+import random
+import time
+from typing import TYPE_CHECKING, Any, TypeVar
 
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.update_coordinator import (
     DataUpdateCoordinator,
     UpdateFailed,
 )
+from homeassistant.util import dt as dt_util
 
 from .api import SmartShoprApiClient, SmartShoprApiError
-from .const import DOMAIN, SCAN_INTERVAL
+from .const import (
+    DEFAULT_COMPLETED_MAX_AGE,
+    DEFAULT_MAX_SCAN_INTERVAL,
+    DEFAULT_MIN_SCAN_INTERVAL,
+    DOMAIN,
+    ERROR_JITTER,
+    FINANCE_SCAN_INTERVAL,
+    FULL_SYNC_EVERY,
+    IDLE_BACKOFF_FACTOR,
+    MAX_CONCURRENT_REQUESTS,
+    PUSH_SAFETY_SCAN_INTERVAL,
+    SCAN_INTERVAL,
+)
+from .hub import SmartShoprSharedListHub
+from .index import SmartShoprItemIndex
+from .metrics import refresh_request_count
+from .models import Budget, ListItem, MonthlyExpenses, ShoppingList
+
+if TYPE_CHECKING:
+    from .expense_statistics import SmartShoprStatistics
+    from .push import SmartShoprPushListener
+    from .write_queue import SmartShoprWriteQueue
 
 _LOGGER = logging.getLogger(__name__)
 
+_T = TypeVar("_T")
+
+
+def build_lists_snapshot(lists: list[ShoppingList]) -> dict[str, Any]:
+    """Build the lists coordinator data, with lookup tables by id."""
+    return {
+        "lists": lists,
+        "lists_by_id": {shopping_list.id: shopping_list for shopping_list in lists},
+        "items_by_id": {
+            item.id: item for shopping_list in lists for item in shopping_list.items
+        },
+    }
+
+
+def _drop_old_completed(
+    items: tuple[ListItem, ...], cutoff: datetime | None
+) -> tuple[ListItem, ...]:
+    """Return the items without those completed before the cutoff.
+
+    Returns the same tuple if no item is dropped. Items without a valid
+    completion time are kept.
+    """
+    if cutoff is None:
+        return items
+    kept = tuple(item for item in items if not _completed_before(item, cutoff))
+    return items if len(kept) == len(items) else kept
+
+
+def _completed_before(item: ListItem, cutoff: datetime) -> bool:
+    """Return True if an item was completed before the cutoff."""
+    if not item.is_completed or item.completed_at is None:
+        return False
+    completed_at = dt_util.parse_datetime(item.completed_at)
+    return completed_at is not None and completed_at < cutoff
+
+
+def build_finance_snapshot(
+    budgets: list[Budget],
+    expenses: MonthlyExpenses,
+) -> dict[str, Any]:
+    """Build the finance coordinator data, with lookup tables by id."""
+    return {
+        "budgets": budgets,
+        "expenses": expenses,
+        "budgets_by_id": {budget.id: budget for budget in budgets},
+    }
+
 
-class SmartShoprDataUpdateCoordinator(DataUpdateCoordinator[dict[str, Any]]):
-    """Class to manage fetching SmartShopr data."""
+@dataclass
+class SmartShoprData:
+    """Runtime data of a SmartShopr config entry."""
+
+    client: SmartShoprApiClient
+    lists: SmartShoprListsCoordinator
+    finance: SmartShoprFinanceCoordinator
+    write_queue: SmartShoprWriteQueue
+    statistics: SmartShoprStatistics | None = None
+    push: SmartShoprPushListener | None = None
+
+
+class SmartShoprCoordinator(DataUpdateCoordinator[dict[str, Any]]):
+    """Base class for SmartShopr coordinators."""
 
     def __init__(
         self,
         hass: HomeAssistant,
         client: SmartShoprApiClient,
+        name: str,
+        update_interval: timedelta,
+        max_concurrent_requests: int = MAX_CONCURRENT_REQUESTS,
     ) -> None:
         """Initialize the coordinator."""
         super().__init__(
             hass,
             _LOGGER,
-            name=DOMAIN,
-            update_interval=timedelta(seconds=SCAN_INTERVAL),
+            name=name,
+            update_interval=update_interval,
         )
         self.client = client
+        self._semaphore = asyncio.Semaphore(max_concurrent_requests)
+        # State writes skipped by entities whose data did not change
+        self.suppressed_writes = 0
+        self.last_refresh_duration: float | None = None
+        self.last_refresh_requests: int | None = None
+        # Seconds the last refresh started later than scheduled
+        self.last_refresh_lag: float | None = None
+        self._next_refresh_due: float | None = None
+        # Requested refresh in progress, and whether another one was requested
+        self._requested_refresh: asyncio.Task | None = None
+        self._refresh_requested_again = False
+
+    @callback
+    def async_update_listeners(self) -> None:
+        """Update all registered listeners and count skipped state writes."""
+        self.suppressed_writes = 0
+        super().async_update_listeners()
+        _LOGGER.debug(
+            "%s: skipped %d of %d state writes for unchanged entities",
+            self.name,
+            self.suppressed_writes,
+            len(self._listeners),
+        )
+
+    async def async_request_refresh(self) -> None:
+        """Request a refresh and wait for it.
+
+        Requests made while a requested refresh is running are merged into
+        a single follow-up refresh that starts when the running one is done.
+        """
+        if self._requested_refresh is not None:
+            self._refresh_requested_again = True
+        else:
+            self._requested_refresh = asyncio.ensure_future(
+                self._async_run_requested_refreshes()
+            )
+        await asyncio.shield(self._requested_refresh)
+
+    async def _async_run_requested_refreshes(self) -> None:
+        """Refresh until no further refresh was requested meanwhile."""
+        try:
+            while True:
+                self._refresh_requested_again = False
+                await self.async_refresh()
+                if not self._refresh_requested_again:
+                    break
+        finally:
+            self._requested_refresh = None
 
     async def _async_update_data(self) -> dict[str, Any]:
-        """Fetch data from SmartShopr API."""
+        """Fetch data and record the duration and requests of the refresh."""
+        start = time.monotonic()
+        if self._next_refresh_due is not None:
+            self.last_refresh_lag = max(start - self._next_refresh_due, 0.0)
+        counter = [0]
+        token = refresh_request_count.set(counter)
+        try:
+            return await self._async_fetch()
+        finally:
+            refresh_request_count.reset(token)
+            end = time.monotonic()
+            self.last_refresh_duration = end - start
+            self.last_refresh_requests = counter[0]
+            if self.update_interval is not None:
+                self._next_refresh_due = end + self.update_interval.total_seconds()
+
+    @abstractmethod
+    async def _async_fetch(self) -> dict[str, Any]:
+        """Fetch the data of this coordinator from the API."""
+
+    async def _async_gather_limited(self, *aws: Awaitable[_T]) -> list[_T]:
+        """Run awaitables concurrently, bounded by the request semaphore.
+
+        If one of them fails, the remaining ones are cancelled and the
+        error is raised.
+        """
+
+        async def _run(aw: Awaitable[_T]) -> _T:
+            async with self._semaphore:
+                return await aw
+
+        tasks = [asyncio.ensure_future(_run(aw)) for aw in aws]
+        try:
+            return await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+
+
+class SmartShoprFinanceCoordinator(SmartShoprCoordinator):
+    """Class to manage fetching SmartShopr budgets and expenses."""
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        client: SmartShoprApiClient,
+    ) -> None:
+        """Initialize the coordinator."""
+        super().__init__(
+            hass,
+            client,
+            name=f"{DOMAIN}_finance",
+            update_interval=timedelta(seconds=FINANCE_SCAN_INTERVAL),
+        )
+
+    async def _async_fetch(self) -> dict[str, Any]:
+        """Fetch budgets and expenses from SmartShopr API.
+
+        Snapshots fetched by the lists coordinator are passed on to this
+        one. On its own it uses the two small endpoints, a snapshot would
+        also carry all items.
+        """
+        try:
+            budgets, expenses = await self._async_gather_limited(
+                self.client.get_budgets(),
+                self.client.get_monthly_expenses(),
+            )
+        except SmartShoprApiError as err:
+            raise UpdateFailed(f"Error communicating with API: {err}") from err
+
+        return build_finance_snapshot(budgets, expenses)
+
+
+class SmartShoprListsCoordinator(SmartShoprCoordinator):
+    """Class to manage fetching SmartShopr lists and their items."""
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        client: SmartShoprApiClient,
+        max_concurrent_requests: int = MAX_CONCURRENT_REQUESTS,
+        incremental_sync: bool = True,
+        min_interval: float = DEFAULT_MIN_SCAN_INTERVAL,
+        max_interval: float = DEFAULT_MAX_SCAN_INTERVAL,
+        shared_lists: SmartShoprSharedListHub | None = None,
+        completed_max_age: int = DEFAULT_COMPLETED_MAX_AGE,
+    ) -> None:
+        """Initialize the coordinator."""
+        super().__init__(
+            hass,
+            client,
+            name=f"{DOMAIN}_lists",
+            update_interval=timedelta(
+                seconds=min(max(SCAN_INTERVAL, min_interval), max_interval)
+            ),
+            max_concurrent_requests=max_concurrent_requests,
+        )
+        self._min_interval = min_interval
+        self._max_interval = max_interval
+        self._consecutive_errors = 0
+        # Duration in seconds of each phase of the last refresh
+        self.refresh_timings: dict[str, float] = {}
+        self.incremental_sync = incremental_sync
+        # Change markers of the lists as of the last refresh
+        self._list_markers: dict[str, tuple[Any, Any]] = {}
+        self._refreshes_since_full_sync = 0
+        # Lists whose items are fetched on the next refresh, even if unchanged
+        self._stale_lists: set[str] = set()
+        self._shared_lists = shared_lists
+        # Days completed items are kept, 0 keeps all of them
+        self._completed_max_age = completed_max_age
+        # Whether change events arrive over the push connection
+        self.push_connected = False
+        # Todo writes not sent yet, applied on top of every refresh
+        self.write_queue: SmartShoprWriteQueue | None = None
+        # Items of the current data by name
+        self.item_index = SmartShoprItemIndex()
+        # Receives the budgets and expenses of snapshot responses
+        self.finance: SmartShoprFinanceCoordinator | None = None
+
+    @callback
+    def _async_set_list_items(
+        self, list_id: str, items: tuple[ListItem, ...]
+    ) -> None:
+        """Replace the items of a list in the snapshot and notify entities."""
+        lists = [
+            replace(shopping_list, items=items)
+            if shopping_list.id == list_id
+            else shopping_list
+            for shopping_list in self.data["lists"]
+        ]
+        self.item_index.update_list(list_id, items)
+        # Poll again soon to pick up the server's view of the change
+        self._set_interval(self._min_interval)
+        self.async_set_updated_data(build_lists_snapshot(lists))
+
+    @callback
+    def async_upsert_item(self, list_id: str, item: ListItem) -> None:
+        """Add or replace an item of a list without fetching from the API."""
+        shopping_list = self.data["lists_by_id"].get(list_id)
+        if shopping_list is None:
+            return
+        items = list(shopping_list.items)
+        for index, existing in enumerate(items):
+            if existing.id == item.id:
+                items[index] = item
+                break
+        else:
+            items.append(item)
+        self._async_set_list_items(list_id, tuple(items))
+
+    @callback
+    def async_replace_item(self, list_id: str, item_id: str, item: ListItem) -> None:
+        """Replace an item by one with another id, keeping its position."""
+        shopping_list = self.data["lists_by_id"].get(list_id)
+        if shopping_list is None:
+            return
+        items = [
+            existing for existing in shopping_list.items if existing.id != item.id
+        ]
+        for index, existing in enumerate(items):
+            if existing.id == item_id:
+                items[index] = item
+                break
+        else:
+            items.append(item)
+        self._async_set_list_items(list_id, tuple(items))
+
+    @callback
+    def async_remove_items(self, list_id: str, item_ids: list[str]) -> None:
+        """Remove items of a list without fetching from the API."""
+        shopping_list = self.data["lists_by_id"].get(list_id)
+        if shopping_list is None:
+            return
+        wanted = set(item_ids)
+        items = tuple(item for item in shopping_list.items if item.id not in wanted)
+        if len(items) != len(shopping_list.items):
+            self._async_set_list_items(list_id, items)
+
+    @callback
+    def async_invalidate_list(self, list_id: str) -> None:
+        """Fetch the items of a list on the next refresh.
+
+        Used when the items shown no longer match the server, e.g. after
+        a write that was shown right away was rejected.
+        """
+        self._stale_lists.add(list_id)
+
+    @property
+    def list_markers(self) -> dict[str, tuple[Any, Any]]:
+        """Return the change markers of the lists in the current data."""
+        return self._list_markers
+
+    @callback
+    def async_restore(
+        self,
+        lists: list[ShoppingList],
+        list_markers: dict[str, list[Any]],
+    ) -> None:
+        """Publish persisted data until the first refresh completes."""
+        self._list_markers = {
+            list_id: tuple(marker) for list_id, marker in list_markers.items()
+        }
+        self.item_index.update(lists)
+        self.async_set_updated_data(build_lists_snapshot(lists))
+
+    @callback
+    def async_set_push_connected(self, connected: bool) -> None:
+        """Poll only as a safety net while change events are pushed.
+
+        Refreshes right away in both directions, to pick up changes made
+        while no events were received.
+        """
+        self.push_connected = connected
+        self._set_interval(self._min_interval)
+        self.hass.async_create_task(self.async_request_refresh())
+
+    def _set_interval(self, seconds: float) -> None:
+        """Set the delay until the next scheduled refresh."""
+        if self.push_connected:
+            seconds = max(seconds, PUSH_SAFETY_SCAN_INTERVAL)
+        self.update_interval = timedelta(seconds=seconds)
+
+    def _schedule_after_success(self, changed: bool) -> None:
+        """Poll fast while data changes and slow down while it does not."""
+        self._consecutive_errors = 0
+        if changed:
+            seconds = self._min_interval
+        else:
+            seconds = min(
+                self.update_interval.total_seconds() * IDLE_BACKOFF_FACTOR,
+                self._max_interval,
+            )
+        self._set_interval(seconds)
+
+    def _schedule_after_error(self) -> None:
+        """Back off exponentially, with jitter, while requests fail."""
+        self._consecutive_errors += 1
+        seconds = min(
+            self._min_interval * 2**self._consecutive_errors, self._max_interval
+        )
+        self._set_interval(seconds * random.uniform(1 - ERROR_JITTER, 1 + ERROR_JITTER))
+
+    def _previous_items(self) -> dict[str, tuple[ListItem, ...]]:
+        """Return the item arrays of the previous snapshot by list id."""
+        if self.data is None:
+            return {}
+        return {
+            shopping_list.id: shopping_list.items
+            for shopping_list in self.data.get("lists", [])
+        }
+
+    def _is_dirty(
+        self,
+        shopping_list: ShoppingList,
+        previous_items: dict[str, tuple[ListItem, ...]],
+    ) -> bool:
+        """Return True if the items of a list have to be fetched."""
+        if (
+            not self.incremental_sync
+            or self._refreshes_since_full_sync >= FULL_SYNC_EVERY
+        ):
+            return True
+        if (
+            shopping_list.id not in previous_items
+            or shopping_list.id in self._stale_lists
+        ):
+            return True
+        marker = shopping_list.marker
+        return marker is None or marker != self._list_markers.get(shopping_list.id)
+
+    def _completed_cutoff(self) -> datetime | None:
+        """Return the time before which completed items are skipped.
+
+        The cutoff is a midnight, so it stays the same all day and the
+        pages requested with it can still be answered with 304.
+        """
+        if not self._completed_max_age:
+            return None
+        return dt_util.start_of_local_day(
+            dt_util.utcnow() - timedelta(days=self._completed_max_age)
+        ).astimezone(dt_util.UTC)
+
+    async def _async_collect_items(
+        self, list_id: str, cutoff: datetime | None
+    ) -> tuple[ListItem, ...]:
+        """Fetch the items of a list page by page, skipping old completed ones."""
+        return tuple(
+            [
+                item
+                async for item in self.client.iter_list_items(
+                    list_id, completed_since=cutoff
+                )
+                if cutoff is None or not _completed_before(item, cutoff)
+            ]
+        )
+
+    async def _async_fetch_items(
+        self, shopping_list: ShoppingList
+    ) -> tuple[ListItem, ...]:
+        """Fetch the items of a list, sharing them with other entries."""
+        list_id = shopping_list.id
+        cutoff = self._completed_cutoff()
+        if self._shared_lists is None or not shopping_list.shared:
+            return await self._async_collect_items(list_id, cutoff)
+        # Other entries may keep more completed items, the shared fetch keeps all
+        items = await self._shared_lists.async_get_items(
+            list_id,
+            shopping_list.marker,
+            lambda: self._async_collect_items(list_id, None),
+        )
+        return _drop_old_completed(items, cutoff)
+
+    async def _async_fetch(self) -> dict[str, Any]:
+        """Fetch lists and items from SmartShopr API."""
+        start = time.monotonic()
+        previous_items = self._previous_items()
+        # Lists invalidated during this refresh stay stale for the next one
+        stale_lists = set(self._stale_lists)
         try:
-            # Fetch all data in parallel
-            lists = await self.client.get_lists()
-            budgets = await self.client.get_budgets()
-            expenses = await self.client.get_monthly_expenses()
-
-            # Fetch items for each list
-            lists_with_items = []
-            for shopping_list in lists:
-                items = await self.client.get_list_items(shopping_list["id"])
-                lists_with_items.append({
-                    **shopping_list,
-                    "items": items,
-                })
-
-            return {
-                "lists": lists_with_items,
-                "budgets": budgets,
-                "expenses": expenses,
-            }
+            if (snapshot := await self.client.get_snapshot()) is not None:
+                # Everything arrived in one response, with the items embedded
+                lists = dirty = snapshot.lists
+                cutoff = self._completed_cutoff()
+                fetched = [
+                    _drop_old_completed(shopping_list.items, cutoff)
+                    for shopping_list in lists
+                ]
+                lists_done = items_done = time.monotonic()
+            else:
+                lists = await self.client.get_lists()
+                lists_done = time.monotonic()
+
+                # Fetch items for each changed list in parallel
+                dirty = [
+                    shopping_list
+                    for shopping_list in lists
+                    if self._is_dirty(shopping_list, previous_items)
+                ]
+                fetched = await self._async_gather_limited(
+                    *(
+                        self._async_fetch_items(shopping_list)
+                        for shopping_list in dirty
+                    )
+                )
+                items_done = time.monotonic()
 
         except SmartShoprApiError as err:
+            self._schedule_after_error()
             raise UpdateFailed(f"Error communicating with API: {err}") from err
+
+        fetched_items = {
+            shopping_list.id: items for shopping_list, items in zip(dirty, fetched)
+        }
+        self._stale_lists -= stale_lists & fetched_items.keys()
+        lists_with_items = []
+        for shopping_list in lists:
+            previous = previous_items.get(shopping_list.id)
+            items = fetched_items.get(shopping_list.id, previous)
+            if self.write_queue is not None:
+                items = self.write_queue.apply_pending(shopping_list.id, items)
+            # Keep the previous array if the contents did not change
+            if previous is not None and items is not previous and items == previous:
+                items = previous
+            lists_with_items.append(replace(shopping_list, items=items))
+
+        if len(dirty) == len(lists):
+            self._refreshes_since_full_sync = 0
+        else:
+            self._refreshes_since_full_sync += 1
+        self._list_markers = {
+            shopping_list.id: marker
+            for shopping_list in lists
+            if (marker := shopping_list.marker) is not None
+        }
+
+        self.refresh_timings = {
+            "lists": lists_done - start,
+            "items": items_done - lists_done,
+            "total": items_done - start,
+        }
+        _LOGGER.debug(
+            "Refreshed %d lists (%d fetched) in %.3fs (lists %.3fs, items %.3fs)",
+            len(lists),
+            len(dirty),
+            self.refresh_timings["total"],
+            self.refresh_timings["lists"],
+            self.refresh_timings["items"],
+        )
+
+        changed = (
+            self.data is None
+            or len(lists_with_items) != len(previous_items)
+            or any(
+                shopping_list.items is not previous_items.get(shopping_list.id)
+                for shopping_list in lists_with_items
+            )
+        )
+        self._schedule_after_success(changed)
+
+        if snapshot is not None and self.finance is not None:
+            # Spares the finance coordinator its own request
+            self.finance.async_set_updated_data(
+                build_finance_snapshot(snapshot.budgets, snapshot.expenses)
+            )
+
+        # Only lists with a new items tuple are indexed again
+        self.item_index.update(lists_with_items)
+        return build_lists_snapshot(lists_with_items)
@@ -0,0 +1,42 @@
+"""JSON decoding for SmartShopr API responses."""
+from __future__ import annotations
+
+import asyncio
+import json
+import time
+from typing import Any
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+from .const import JSON_EXECUTOR_THRESHOLD
+
+# Name of the decoder in use, for diagnostics
+DECODER = "orjson" if orjson is not None else "json"
+
+_loads = orjson.loads if orjson is not None else json.loads
+
+
+def _timed_loads(body: bytes) -> tuple[Any, float]:
+    """Decode a body and return the result and the decode time."""
+    start = time.perf_counter()
+    result = _loads(body)
+    return result, time.perf_counter() - start
+
+
+async def async_decode_json(body: bytes) -> tuple[Any, float, bool]:
+    """Decode a JSON body with the fastest available decoder.
+
+    Bodies larger than JSON_EXECUTOR_THRESHOLD bytes are decoded in the
+    executor so the event loop is not blocked. Returns the result, the
+    decode time and whether the executor was used. Raises ValueError for
+    invalid JSON.
+    """
+    if len(body) <= JSON_EXECUTOR_THRESHOLD:
+        result, elapsed = _timed_loads(body)
+        return result, elapsed, False
+    loop = asyncio.get_running_loop()
+    result, elapsed = await loop.run_in_executor(None, _timed_loads, body)
+    return result, elapsed, True
@@ -0,0 +1,52 @@
+"""Diagnostics support for SmartShopr."""
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import CONF_API_KEY, CONF_UNIQUE_ID
+from homeassistant.core import HomeAssistant
+
+from .const import DATA_SHARED_LISTS, DOMAIN
+from .coordinator import SmartShoprCoordinator, SmartShoprData
+
+# The unique id of the entry is the start of the API key
+TO_REDACT = {CONF_API_KEY, CONF_UNIQUE_ID, "title"}
+
+
+def _coordinator_diagnostics(coordinator: SmartShoprCoordinator) -> dict[str, Any]:
+    """Return the state of a coordinator."""
+    return {
+        "last_update_success": coordinator.last_update_success,
+        "update_interval": coordinator.update_interval.total_seconds()
+        if coordinator.update_interval
+        else None,
+        "suppressed_writes": coordinator.suppressed_writes,
+        "last_refresh_duration": coordinator.last_refresh_duration,
+        "last_refresh_requests": coordinator.last_refresh_requests,
+        "last_refresh_lag": coordinator.last_refresh_lag,
+    }
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> dict[str, Any]:
+    """Return diagnostics for a config entry."""
+    data: SmartShoprData = hass.data[DOMAIN][entry.entry_id]
+
+    return {
+        "entry": async_redact_data(entry.as_dict(), TO_REDACT),
+        "client": data.client.as_diagnostics(),
+        "lists": {
+            **_coordinator_diagnostics(data.lists),
+            "refresh_timings": data.lists.refresh_timings,
+            "list_count": len(data.lists.data["lists"]) if data.lists.data else 0,
+            "indexed_names": len(data.lists.item_index),
+        },
+        "finance": _coordinator_diagnostics(data.finance),
+        "write_queue": data.write_queue.as_diagnostics(),
+        "statistics": data.statistics.as_diagnostics() if data.statistics else None,
+        "push": data.push.as_diagnostics() if data.push else None,
+        "shared_lists": hass.data[DOMAIN][DATA_SHARED_LISTS].as_diagnostics(),
+    }
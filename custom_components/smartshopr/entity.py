@@ -0,0 +1,116 @@
+"""Base entity for SmartShopr."""
+from __future__ import annotations
+
+from abc import abstractmethod
+from collections.abc import Callable
+from typing import Any, TypeVar
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import Platform
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers import entity_registry as er
+from homeassistant.helpers.entity import Entity
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
+
+from .const import DOMAIN
+from .coordinator import SmartShoprCoordinator
+
+_CoordinatorT = TypeVar("_CoordinatorT", bound=SmartShoprCoordinator)
+
+_UNSET = object()
+
+
+class SmartShoprEntity(CoordinatorEntity[_CoordinatorT]):
+    """Base class for SmartShopr entities.
+
+    State is only written when the entity's slice of the coordinator data
+    or its availability changed since the last write.
+    """
+
+    def __init__(self, coordinator: _CoordinatorT) -> None:
+        """Initialize the entity."""
+        super().__init__(coordinator)
+        self._last_fingerprint: Any = _UNSET
+        self._last_available: bool | None = None
+
+    @abstractmethod
+    def _data_fingerprint(self) -> Any:
+        """Return the part of the coordinator data the state depends on."""
+
+    def _remember_state(self) -> None:
+        """Remember what the last written state was built from."""
+        self._last_fingerprint = self._data_fingerprint()
+        self._last_available = self.available
+
+    async def async_added_to_hass(self) -> None:
+        """When entity is added to hass."""
+        await super().async_added_to_hass()
+        self._remember_state()
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Handle updated data from the coordinator."""
+        fingerprint = self._data_fingerprint()
+        if self.available == self._last_available and (
+            fingerprint is self._last_fingerprint
+            or fingerprint == self._last_fingerprint
+        ):
+            self.coordinator.suppressed_writes += 1
+            return
+        self._remember_state()
+        super()._handle_coordinator_update()
+
+
+@callback
+def async_reconcile_entities(
+    hass: HomeAssistant,
+    entry: ConfigEntry,
+    coordinator: SmartShoprCoordinator,
+    platform: Platform,
+    async_add_entities: AddEntitiesCallback,
+    get_objects: Callable[[dict[str, Any]], dict[str, Any]],
+    create_entity: Callable[[Any], Entity],
+    unique_id: Callable[[str], str],
+) -> None:
+    """Keep one entity per object in the coordinator data.
+
+    get_objects returns the objects of the data by id. After every update,
+    entities are added for new ids and removed from the entity registry
+    for ids that disappeared, without reloading the config entry.
+    """
+    known: set[str] = set()
+
+    @callback
+    def _async_reconcile() -> None:
+        """Add and remove entities for the current data."""
+        if coordinator.data is None:
+            return
+        objects = get_objects(coordinator.data)
+        if objects.keys() == known:
+            return
+
+        if new_entities := [
+            create_entity(obj)
+            for object_id, obj in objects.items()
+            if object_id not in known
+        ]:
+            async_add_entities(new_entities)
+
+        registry = er.async_get(hass)
+        for object_id in known - objects.keys():
+            entity_id = registry.async_get_entity_id(
+                platform, DOMAIN, unique_id(object_id)
+            )
+            if (
+                entity_id is not None
+                and (entity_entry := registry.async_get(entity_id)) is not None
+                and entity_entry.config_entry_id == entry.entry_id
+            ):
+                registry.async_remove(entity_id)
+
+        known.clear()
+        known.update(objects)
+
+    _async_reconcile()
+    entry.async_on_unload(coordinator.async_add_listener(_async_reconcile))
@@ -0,0 +1,253 @@
+"""Long-term expense and budget statistics for SmartShopr."""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from datetime import datetime
+import logging
+from typing import Any
+
+from homeassistant.components.recorder.models import StatisticData, StatisticMetaData
+from homeassistant.components.recorder.statistics import async_add_external_statistics
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import CURRENCY_EURO
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.event import async_track_utc_time_change
+from homeassistant.helpers.storage import Store
+from homeassistant.util import dt as dt_util, slugify
+
+from .const import DOMAIN, STATISTICS_SAVE_DELAY, STORAGE_VERSION
+from .coordinator import SmartShoprFinanceCoordinator
+
+_LOGGER = logging.getLogger(__name__)
+
+
+@dataclass(slots=True)
+class StatisticSeries:
+    """A value tracked between polls, and its changes per hour not imported yet."""
+
+    name: str
+    unit: str
+    value: float | None = None  # Last polled value
+    sum: float = 0.0  # Sum of all imported changes
+    # Start of the hour as Unix time -> [change, last value in that hour]
+    pending: dict[int, list[float]] = field(default_factory=dict)
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> StatisticSeries:
+        """Create a series from its stored representation."""
+        return cls(
+            name=data["name"],
+            unit=data["unit"],
+            value=data.get("value"),
+            sum=data.get("sum", 0.0),
+            pending={int(start): row for start, row in data.get("pending", {}).items()},
+        )
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the stored representation of the series."""
+        return {
+            "name": self.name,
+            "unit": self.unit,
+            "value": self.value,
+            "sum": self.sum,
+            "pending": {str(start): row for start, row in self.pending.items()},
+        }
+
+    def observe(
+        self, value: float, hour: int, first: bool, new_period: bool = False
+    ) -> None:
+        """Add the change since the last poll to the pending hour.
+
+        The value counts from zero in a new period, after it dropped, and
+        for series that appear after the first poll. On the first poll it
+        is only the starting point.
+        """
+        if not first:
+            previous = self.value or 0.0
+            # Spending only grows, a lower value was reset in between
+            reset = new_period or value < previous
+            if reset:
+                previous = 0.0
+            if (change := value - previous) or reset:
+                row = self.pending.setdefault(hour, [0.0, value])
+                row[0] = round(row[0] + change, 2)
+                row[1] = value
+        self.value = value
+
+    def pop_closed(self, before: int) -> list[StatisticData]:
+        """Return the rows of the hours starting before a time, and forget them."""
+        rows: list[StatisticData] = []
+        for start in sorted(start for start in self.pending if start < before):
+            change, state = self.pending.pop(start)
+            self.sum = round(self.sum + change, 2)
+            rows.append(
+                StatisticData(
+                    start=dt_util.utc_from_timestamp(start), state=state, sum=self.sum
+                )
+            )
+        return rows
+
+
+def _storage_key(entry_id: str) -> str:
+    """Return the storage key of the statistics of a config entry."""
+    return f"{DOMAIN}.{entry_id}.statistics"
+
+
+async def async_remove_statistics(hass: HomeAssistant, entry_id: str) -> None:
+    """Remove the stored statistics state of a removed config entry."""
+    await Store(hass, STORAGE_VERSION, _storage_key(entry_id)).async_remove()
+
+
+def _hour_start(now: datetime) -> int:
+    """Return the start of the hour of a time, as Unix time."""
+    return int(now.timestamp()) // 3600 * 3600
+
+
+class SmartShoprStatistics:
+    """Import expense and budget changes as hourly long-term statistics.
+
+    Every finance update is compared with the previous one, and the change
+    is added to the current hour of each currency and budget. Finished
+    hours are imported into the recorder in one batch per statistic at
+    the start of the next hour, with the running sum, so dashboards can
+    show spending per hour, day or month without reading sensor history.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        entry_id: str,
+        coordinator: SmartShoprFinanceCoordinator,
+    ) -> None:
+        """Initialize the statistics."""
+        self.hass = hass
+        self.coordinator = coordinator
+        self._prefix = f"{DOMAIN}:{slugify(entry_id)}"
+        self._store: Store[dict[str, Any]] = Store(
+            hass, STORAGE_VERSION, _storage_key(entry_id)
+        )
+        self._series: dict[str, StatisticSeries] = {}
+        self._month: str | None = None
+        self.imported_rows = 0
+
+    async def async_load(self) -> None:
+        """Load the values and changes left over from the last run."""
+        if (data := await self._store.async_load()) is not None:
+            self._month = data.get("month")
+            self._series = {
+                statistic_id: StatisticSeries.from_dict(series)
+                for statistic_id, series in data.get("series", {}).items()
+            }
+
+    def _data_to_save(self) -> dict[str, Any]:
+        """Return the data to store."""
+        return {
+            "month": self._month,
+            "series": {
+                statistic_id: series.as_dict()
+                for statistic_id, series in self._series.items()
+            },
+        }
+
+    @callback
+    def async_start(self, entry: ConfigEntry) -> None:
+        """Follow the finance updates and import at the start of every hour."""
+        entry.async_on_unload(self.coordinator.async_add_listener(self._async_observe))
+        entry.async_on_unload(
+            async_track_utc_time_change(
+                self.hass, self._async_import_closed, minute=0, second=10
+            )
+        )
+        entry.async_on_unload(self._async_save_now)
+        # Hours that ended while Home Assistant was stopped
+        self._async_import_closed()
+
+    def _series_for(self, statistic_id: str, name: str, unit: str) -> StatisticSeries:
+        """Return a series, created on first use."""
+        if (series := self._series.get(statistic_id)) is None:
+            series = self._series[statistic_id] = StatisticSeries(name, unit)
+        else:
+            series.name = name
+        return series
+
+    @callback
+    def _async_observe(self) -> None:
+        """Add the changes of a finance update to the current hour."""
+        if not self.coordinator.last_update_success or self.coordinator.data is None:
+            return
+        now = dt_util.utcnow()
+        hour = _hour_start(now)
+        expenses = self.coordinator.data["expenses"]
+        month = expenses.month or dt_util.as_local(now).strftime("%Y-%m")
+        first = self._month is None
+        # Expenses count from zero again in a new month, budgets reset on
+        # their own schedule and are only seen to drop
+        new_period = not first and month != self._month
+        self._month = month
+
+        for currency, total in expenses.totals.items():
+            series = self._series_for(
+                f"{self._prefix}_expenses_{slugify(currency)}",
+                f"SmartShopr expenses {currency}",
+                currency,
+            )
+            series.observe(total, hour, first, new_period)
+        if new_period:
+            # Currencies without expenses this month are not sent at all
+            for statistic_id, series in self._series.items():
+                if (
+                    "_expenses_" in statistic_id
+                    and series.unit not in expenses.totals
+                    and series.value
+                ):
+                    series.observe(0.0, hour, first, new_period)
+
+        for budget in self.coordinator.data["budgets"]:
+            series = self._series_for(
+                f"{self._prefix}_budget_{slugify(budget.id)}",
+                f"SmartShopr budget {budget.name}",
+                CURRENCY_EURO,
+            )
+            series.observe(budget.spent, hour, first)
+
+        self._store.async_delay_save(self._data_to_save, STATISTICS_SAVE_DELAY)
+
+    @callback
+    def _async_import_closed(self, _now: datetime | None = None) -> None:
+        """Import the changes of all finished hours, one batch per statistic."""
+        before = _hour_start(dt_util.utcnow())
+        imported = False
+        for statistic_id, series in self._series.items():
+            if not (rows := series.pop_closed(before)):
+                continue
+            metadata = StatisticMetaData(
+                has_mean=False,
+                has_sum=True,
+                name=series.name,
+                source=DOMAIN,
+                statistic_id=statistic_id,
+                unit_of_measurement=series.unit,
+            )
+            async_add_external_statistics(self.hass, metadata, rows)
+            self.imported_rows += len(rows)
+            imported = True
+        if imported:
+            _LOGGER.debug(
+                "Imported statistics up to %s", dt_util.utc_from_timestamp(before)
+            )
+            self._store.async_delay_save(self._data_to_save, STATISTICS_SAVE_DELAY)
+
+    @callback
+    def _async_save_now(self) -> None:
+        """Save right away, the current hour is imported after the reload."""
+        self.hass.async_create_task(self._store.async_save(self._data_to_save()))
+
+    def as_diagnostics(self) -> dict[str, Any]:
+        """Return the statistics state for diagnostics."""
+        return {
+            "series": len(self._series),
+            "pending_hours": sum(
+                len(series.pending) for series in self._series.values()
+            ),
+            "imported_rows": self.imported_rows,
+        }
@@ -0,0 +1,74 @@
+"""Items of shared lists, fetched once for all SmartShopr accounts."""
+from __future__ import annotations
+
+from collections.abc import Awaitable, Callable
+import time
+from typing import Any
+
+from .const import SHARED_LIST_CACHE_TTL, SHARED_LIST_REUSE_WINDOW
+from .models import ListItem
+from .resilience import SharedTasks
+
+
+class SmartShoprSharedListHub:
+    """Share the items of lists that several config entries can see.
+
+    A list shared between accounts is fetched by whichever entry needs it
+    first. Other entries asking for the same list with the same change
+    marker, or within SHARED_LIST_REUSE_WINDOW seconds when the API sends
+    no marker, get the same items tuple.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the hub."""
+        # List id -> (change marker, fetch time, items)
+        self._items: dict[str, tuple[Any, float, tuple[ListItem, ...]]] = {}
+        self._inflight: SharedTasks[tuple[ListItem, ...]] = SharedTasks()
+        self.fetches = 0
+        self.reused = 0
+
+    async def async_get_items(
+        self,
+        list_id: str,
+        marker: Any,
+        fetch: Callable[[], Awaitable[tuple[ListItem, ...]]],
+    ) -> tuple[ListItem, ...]:
+        """Return the items of a shared list, calling fetch only if needed."""
+        now = time.monotonic()
+        self._prune(now)
+
+        if (cached := self._items.get(list_id)) is not None:
+            cached_marker, fetched_at, items = cached
+            if (marker is not None and marker == cached_marker) or (
+                marker is None and now - fetched_at < SHARED_LIST_REUSE_WINDOW
+            ):
+                self.reused += 1
+                return items
+
+        async def _fetch() -> tuple[ListItem, ...]:
+            items = await fetch()
+            self.fetches += 1
+            self._items[list_id] = (marker, time.monotonic(), items)
+            return items
+
+        key = (list_id, marker)
+        if key in self._inflight:
+            self.reused += 1
+        return await self._inflight.async_run(key, _fetch)
+
+    def _prune(self, now: float) -> None:
+        """Forget lists nobody fetched for a long time."""
+        for list_id in [
+            list_id
+            for list_id, (_, fetched_at, _) in self._items.items()
+            if now - fetched_at > SHARED_LIST_CACHE_TTL
+        ]:
+            del self._items[list_id]
+
+    def as_diagnostics(self) -> dict[str, Any]:
+        """Return hub statistics for diagnostics."""
+        return {
+            "cached_lists": len(self._items),
+            "fetches": self.fetches,
+            "reused": self.reused,
+        }
@@ -0,0 +1,82 @@
+"""Index of SmartShopr items by name."""
+from __future__ import annotations
+
+from collections.abc import Iterable
+from functools import lru_cache
+import unicodedata
+
+from .models import ListItem, ShoppingList
+
+
+@lru_cache(maxsize=4096)
+def normalize_name(name: str) -> str:
+    """Return the name items are matched by, ignoring case and spacing."""
+    return " ".join(unicodedata.normalize("NFKC", name).casefold().split())
+
+
+class SmartShoprItemIndex:
+    """Find the items of all lists by name without scanning the lists.
+
+    The index is updated per list. Lists whose items tuple is the one
+    already indexed are skipped, so a refresh only indexes changed lists.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the index."""
+        # Items tuple indexed per list id
+        self._indexed: dict[str, tuple[ListItem, ...]] = {}
+        # Items by normalized name, then by list id
+        self._by_name: dict[str, dict[str, list[ListItem]]] = {}
+
+    def __len__(self) -> int:
+        """Return the number of distinct names."""
+        return len(self._by_name)
+
+    def update(self, lists: Iterable[ShoppingList]) -> None:
+        """Index the items of all lists, forgetting lists that are gone."""
+        seen = set()
+        for shopping_list in lists:
+            seen.add(shopping_list.id)
+            self.update_list(shopping_list.id, shopping_list.items)
+        for list_id in self._indexed.keys() - seen:
+            self._remove_list(list_id)
+
+    def update_list(self, list_id: str, items: tuple[ListItem, ...]) -> None:
+        """Index the items of one list, if they changed."""
+        if self._indexed.get(list_id) is items:
+            return
+        self._remove_list(list_id)
+        self._indexed[list_id] = items
+        for item in items:
+            self._by_name.setdefault(normalize_name(item.name), {}).setdefault(
+                list_id, []
+            ).append(item)
+
+    def _remove_list(self, list_id: str) -> None:
+        """Forget the items of a list."""
+        if (items := self._indexed.pop(list_id, None)) is None:
+            return
+        for name in {normalize_name(item.name) for item in items}:
+            by_list = self._by_name.get(name)
+            if by_list is not None and by_list.pop(list_id, None) is not None:
+                if not by_list:
+                    del self._by_name[name]
+
+    def find(self, name: str) -> list[tuple[str, ListItem]]:
+        """Return the list id and item of all items with the given name."""
+        by_list = self._by_name.get(normalize_name(name))
+        if by_list is None:
+            return []
+        return [
+            (list_id, item) for list_id, items in by_list.items() for item in items
+        ]
+
+    def find_open(self, list_id: str, name: str) -> ListItem | None:
+        """Return the first open item of a list with the given name."""
+        by_list = self._by_name.get(normalize_name(name))
+        if by_list is None:
+            return None
+        return next(
+            (item for item in by_list.get(list_id, ()) if not item.is_completed),
+            None,
+        )
@@ -0,0 +1,137 @@
+"""Request metrics for the SmartShopr API client."""
+from __future__ import annotations
+
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+import re
+from typing import Any
+
+# Upper bounds in seconds of the latency histogram buckets
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_ID_SEGMENT = re.compile(r"^(lists|items)/(?!batch$)[^/]+")
+
+# Requests sent by the coordinator refresh running in the current context
+refresh_request_count: ContextVar[list[int] | None] = ContextVar(
+    "refresh_request_count", default=None
+)
+
+
+def endpoint_template(endpoint: str) -> str:
+    """Return the endpoint with ids replaced, e.g. lists/{id}/items."""
+    return _ID_SEGMENT.sub(r"\1/{id}", endpoint.split("?", 1)[0])
+
+
+@dataclass
+class EndpointMetrics:
+    """Metrics of one API endpoint."""
+
+    requests: int = 0
+    timeouts: int = 0
+    connection_errors: int = 0
+    bytes_received: int = 0
+    latency_total: float = 0.0
+    latency_max: float = 0.0
+    decode_time_total: float = 0.0
+    decode_time_max: float = 0.0
+    executor_decodes: int = 0
+    status_codes: dict[int, int] = field(default_factory=dict)
+    latency_buckets: list[int] = field(
+        default_factory=lambda: [0] * (len(LATENCY_BUCKETS) + 1)
+    )
+
+    def record(self, status: int, latency: float, size: int) -> None:
+        """Record a response."""
+        self.status_codes[status] = self.status_codes.get(status, 0) + 1
+        self.bytes_received += size
+        self.latency_total += latency
+        self.latency_max = max(self.latency_max, latency)
+        for index, bound in enumerate(LATENCY_BUCKETS):
+            if latency <= bound:
+                self.latency_buckets[index] += 1
+                break
+        else:
+            self.latency_buckets[-1] += 1
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the metrics for diagnostics."""
+        responses = sum(self.status_codes.values())
+        return {
+            "requests": self.requests,
+            "timeouts": self.timeouts,
+            "connection_errors": self.connection_errors,
+            "bytes_received": self.bytes_received,
+            "latency_avg": round(self.latency_total / responses, 4) if responses else None,
+            "latency_max": round(self.latency_max, 4),
+            "decode_time_total": round(self.decode_time_total, 4),
+            "decode_time_max": round(self.decode_time_max, 4),
+            "executor_decodes": self.executor_decodes,
+            "status_codes": self.status_codes,
+            "latency_histogram": {
+                **{
+                    f"le_{bound}": count
+                    for bound, count in zip(LATENCY_BUCKETS, self.latency_buckets)
+                },
+                "le_inf": self.latency_buckets[-1],
+            },
+        }
+
+
+class RequestMetrics:
+    """Metrics of all requests made by an API client."""
+
+    def __init__(self) -> None:
+        """Initialize the metrics."""
+        self.requests = 0
+        self.endpoints: dict[str, EndpointMetrics] = {}
+
+    def _endpoint(self, endpoint: str) -> EndpointMetrics:
+        """Return the metrics of an endpoint."""
+        template = endpoint_template(endpoint)
+        if (metrics := self.endpoints.get(template)) is None:
+            metrics = self.endpoints[template] = EndpointMetrics()
+        return metrics
+
+    def record_request(self, endpoint: str) -> None:
+        """Record a request being sent."""
+        self.requests += 1
+        self._endpoint(endpoint).requests += 1
+        if (counter := refresh_request_count.get()) is not None:
+            counter[0] += 1
+
+    def record_response(
+        self, endpoint: str, status: int, latency: float, size: int
+    ) -> None:
+        """Record a response."""
+        self._endpoint(endpoint).record(status, latency, size)
+
+    def record_decode(self, endpoint: str, seconds: float, in_executor: bool) -> None:
+        """Record the time spent decoding a response body."""
+        metrics = self._endpoint(endpoint)
+        metrics.decode_time_total += seconds
+        metrics.decode_time_max = max(metrics.decode_time_max, seconds)
+        if in_executor:
+            metrics.executor_decodes += 1
+
+    @property
+    def decode_time(self) -> float:
+        """Return the total time spent decoding response bodies."""
+        return sum(metrics.decode_time_total for metrics in self.endpoints.values())
+
+    def record_timeout(self, endpoint: str) -> None:
+        """Record a request that timed out."""
+        self._endpoint(endpoint).timeouts += 1
+
+    def record_connection_error(self, endpoint: str) -> None:
+        """Record a request that failed to connect."""
+        self._endpoint(endpoint).connection_errors += 1
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the metrics for diagnostics."""
+        return {
+            "requests": self.requests,
+            "endpoints": {
+                endpoint: metrics.as_dict()
+                for endpoint, metrics in sorted(self.endpoints.items())
+            },
+        }
@@ -0,0 +1,246 @@
+"""Data models for SmartShopr."""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+import sys
+from typing import Any
+
+
+def _intern(value: Any) -> Any:
+    """Intern a string that repeats across many objects."""
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+def _format_summary(name: str, quantity: float, unit: str | None) -> str:
+    """Return the item name with its quantity, as shown in the todo list."""
+    if quantity > 1:
+        if unit:
+            return f"{name} ({quantity} {unit})"
+        return f"{name} (x{quantity})"
+    if unit:
+        return f"{name} ({unit})"
+    return name
+
+
+@dataclass(frozen=True, slots=True)
+class ListItem:
+    """An item of a shopping list."""
+
+    id: str
+    name: str
+    quantity_value: float = 1
+    quantity_unit: str | None = None
+    is_completed: bool = False
+    list_id: str | None = None
+    # ISO timestamp, if the API sends one
+    completed_at: str | None = None
+    summary: str = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        """Compute the derived fields."""
+        object.__setattr__(
+            self,
+            "summary",
+            _format_summary(self.name, self.quantity_value, self.quantity_unit),
+        )
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> ListItem:
+        """Create an item from its API representation."""
+        quantity = data.get("quantity_value")
+        return cls(
+            id=data["id"],
+            name=data["name"],
+            quantity_value=1 if quantity is None else quantity,
+            quantity_unit=_intern(data.get("quantity_unit")),
+            is_completed=bool(data.get("is_completed", False)),
+            list_id=_intern(data.get("list_id")),
+            completed_at=data.get("completed_at"),
+        )
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the API representation of the item."""
+        return {
+            "id": self.id,
+            "name": self.name,
+            "quantity_value": self.quantity_value,
+            "quantity_unit": self.quantity_unit,
+            "is_completed": self.is_completed,
+            "list_id": self.list_id,
+            "completed_at": self.completed_at,
+        }
+
+
+@dataclass(frozen=True, slots=True)
+class ItemsPage:
+    """One page of the items of a list."""
+
+    items: tuple[ListItem, ...]
+    # Cursor of the next page, None on the last page
+    next_cursor: str | None = None
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> ItemsPage:
+        """Create a page from its API representation."""
+        return cls(
+            items=tuple(ListItem.from_dict(item) for item in data.get("items", [])),
+            next_cursor=data.get("next_cursor") or None,
+        )
+
+
+def parse_item(data: dict[str, Any] | None) -> ListItem | None:
+    """Return the item of a write response or event, None if incomplete."""
+    if not data or "id" not in data or "name" not in data:
+        return None
+    return ListItem.from_dict(data)
+
+
+@dataclass(frozen=True, slots=True)
+class ShoppingList:
+    """A shopping list and its items."""
+
+    id: str
+    name: str
+    shared: bool = False
+    updated_at: Any = None
+    item_count: int | None = None
+    items: tuple[ListItem, ...] = ()
+
+    @property
+    def marker(self) -> tuple[Any, Any] | None:
+        """Return the change marker, or None if the API sends none."""
+        if self.updated_at is None and self.item_count is None:
+            return None
+        return (self.updated_at, self.item_count)
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> ShoppingList:
+        """Create a list from its API or stored representation."""
+        return cls(
+            id=_intern(data["id"]),
+            name=data["name"],
+            shared=bool(data.get("shared", False)),
+            updated_at=data.get("updated_at"),
+            item_count=data.get("item_count"),
+            items=tuple(ListItem.from_dict(item) for item in data.get("items", ())),
+        )
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the stored representation of the list."""
+        return {
+            "id": self.id,
+            "name": self.name,
+            "shared": self.shared,
+            "updated_at": self.updated_at,
+            "item_count": self.item_count,
+            "items": [item.as_dict() for item in self.items],
+        }
+
+
+@dataclass(frozen=True, slots=True)
+class Budget:
+    """A budget and how much of it is spent."""
+
+    id: str
+    name: str
+    target_amount: float | None = None
+    spent: float = 0
+    remaining: float | None = None
+    expense_count: int = 0
+    shared: bool = False
+    percentage_used: float | None = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        """Compute the derived fields."""
+        target = self.target_amount
+        object.__setattr__(
+            self,
+            "percentage_used",
+            self.spent / target * 100 if target and target > 0 else None,
+        )
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> Budget:
+        """Create a budget from its API representation."""
+        return cls(
+            id=_intern(data["id"]),
+            name=data["name"],
+            target_amount=data.get("target_amount"),
+            spent=data.get("spent") or 0,
+            remaining=data.get("remaining"),
+            expense_count=data.get("expense_count") or 0,
+            shared=bool(data.get("shared", False)),
+        )
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the API representation of the budget."""
+        return {
+            "id": self.id,
+            "name": self.name,
+            "target_amount": self.target_amount,
+            "spent": self.spent,
+            "remaining": self.remaining,
+            "expense_count": self.expense_count,
+            "shared": self.shared,
+        }
+
+
+@dataclass(frozen=True, slots=True)
+class MonthlyExpenses:
+    """The expenses of the current month."""
+
+    month: str | None = None
+    # Total by currency code, must not be modified
+    totals: dict[str, float] = field(default_factory=dict)
+    expense_count: int = 0
+    total: float = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        """Compute the derived fields."""
+        totals = self.totals
+        # EUR total, or sum of all currencies
+        if "EUR" in totals:
+            total = round(totals["EUR"], 2)
+        elif totals:
+            total = round(sum(totals.values()), 2)
+        else:
+            total = 0.0
+        object.__setattr__(self, "total", total)
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> MonthlyExpenses:
+        """Create the expenses from their API representation."""
+        return cls(
+            month=data.get("month"),
+            totals={
+                _intern(currency): amount
+                for currency, amount in (data.get("totals") or {}).items()
+            },
+            expense_count=data.get("expense_count") or 0,
+        )
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the API representation of the expenses."""
+        return {
+            "month": self.month,
+            "totals": dict(self.totals),
+            "expense_count": self.expense_count,
+        }
+
+
+@dataclass(frozen=True, slots=True)
+class Snapshot:
+    """Lists with their items, budgets and expenses from one response."""
+
+    lists: list[ShoppingList]
+    budgets: list[Budget]
+    expenses: MonthlyExpenses
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> Snapshot:
+        """Create a snapshot from its API representation."""
+        return cls(
+            lists=[ShoppingList.from_dict(item) for item in data.get("lists", [])],
+            budgets=[Budget.from_dict(budget) for budget in data.get("budgets", [])],
+            expenses=MonthlyExpenses.from_dict(data.get("expenses") or {}),
+        )
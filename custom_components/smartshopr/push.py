@@ -0,0 +1,137 @@
+"""Realtime change events for SmartShopr lists."""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import random
+import time
+from typing import Any
+
+import aiohttp
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant, callback
+
+from .api import SmartShoprApiClient, SmartShoprApiError
+from .const import PUSH_MAX_RECONNECT_DELAY, PUSH_RECONNECT_DELAY
+from .coordinator import SmartShoprListsCoordinator
+from .models import parse_item
+
+_LOGGER = logging.getLogger(__name__)
+
+EVENT_ITEM_UPDATED = "item_updated"
+EVENT_ITEM_DELETED = "item_deleted"
+
+
+class SmartShoprPushListener:
+    """Apply change events from the SmartShopr events websocket.
+
+    Item events are applied to the lists coordinator without fetching.
+    Other events, and events for unknown lists, trigger a refresh. While
+    the websocket is connected the coordinator only polls as a safety
+    net; every (re)connect triggers a refresh to catch missed changes.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        client: SmartShoprApiClient,
+        coordinator: SmartShoprListsCoordinator,
+    ) -> None:
+        """Initialize the listener."""
+        self.hass = hass
+        self.client = client
+        self.coordinator = coordinator
+        self.connected = False
+        self.connects = 0
+        self.events_received = 0
+        self.last_event: float | None = None
+
+    @callback
+    def async_start(self, entry: ConfigEntry) -> None:
+        """Listen for events until the config entry is unloaded."""
+        entry.async_create_background_task(
+            self.hass, self._async_run(), f"{self.coordinator.name} push"
+        )
+
+    async def _async_run(self) -> None:
+        """Keep a websocket connection open, reconnecting with backoff."""
+        delay = PUSH_RECONNECT_DELAY
+        while True:
+            try:
+                websocket = await self.client.async_connect_events()
+                connected_at = time.monotonic()
+                try:
+                    self._set_connected(True)
+                    async for message in websocket:
+                        if message.type != aiohttp.WSMsgType.TEXT:
+                            continue
+                        try:
+                            self._handle_message(message.data)
+                        except Exception:  # pylint: disable=broad-except
+                            _LOGGER.exception("Error handling SmartShopr event")
+                finally:
+                    await websocket.close()
+                _LOGGER.debug("SmartShopr event stream closed")
+                if time.monotonic() - connected_at > PUSH_MAX_RECONNECT_DELAY:
+                    # Only a connection that stayed up resets the backoff
+                    delay = PUSH_RECONNECT_DELAY
+            except (aiohttp.ClientError, TimeoutError, SmartShoprApiError) as err:
+                _LOGGER.debug("SmartShopr event stream unavailable: %s", err)
+            if self.connected:
+                self._set_connected(False)
+            await asyncio.sleep(delay * random.uniform(0.5, 1.0))
+            delay = min(delay * 2, PUSH_MAX_RECONNECT_DELAY)
+
+    @callback
+    def _set_connected(self, connected: bool) -> None:
+        """Switch the coordinator between push and polling."""
+        self.connected = connected
+        if connected:
+            self.connects += 1
+        _LOGGER.debug(
+            "SmartShopr event stream %s", "connected" if connected else "lost"
+        )
+        self.coordinator.async_set_push_connected(connected)
+
+    @callback
+    def _handle_message(self, data: str) -> None:
+        """Apply one event to the coordinator."""
+        try:
+            event = json.loads(data)
+        except ValueError:
+            event = None
+        if not isinstance(event, dict):
+            _LOGGER.debug("Ignoring malformed SmartShopr event: %s", data)
+            return
+        self.events_received += 1
+        self.last_event = time.monotonic()
+
+        coordinator = self.coordinator
+        list_id = event.get("list_id")
+        if coordinator.data is None or list_id not in coordinator.data["lists_by_id"]:
+            self.hass.async_create_task(coordinator.async_request_refresh())
+        elif event.get("type") == EVENT_ITEM_UPDATED and (
+            item := parse_item(event.get("item"))
+        ):
+            if coordinator.write_queue is not None:
+                # Echoes of earlier writes must not undo the waiting ones
+                coordinator.write_queue.async_show_item(list_id, item)
+            else:
+                coordinator.async_upsert_item(list_id, item)
+        elif event.get("type") == EVENT_ITEM_DELETED and "item_id" in event:
+            coordinator.async_remove_items(list_id, [event["item_id"]])
+        else:
+            self.hass.async_create_task(coordinator.async_request_refresh())
+
+    def as_diagnostics(self) -> dict[str, Any]:
+        """Return the listener state for diagnostics."""
+        return {
+            "connected": self.connected,
+            "connects": self.connects,
+            "events_received": self.events_received,
+            "seconds_since_last_event": round(time.monotonic() - self.last_event, 1)
+            if self.last_event is not None
+            else None,
+        }
@@ -0,0 +1,183 @@
+"""Rate limiting, circuit breaking and request sharing for SmartShopr."""
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Awaitable, Callable, Hashable
+from functools import partial
+import logging
+import time
+from typing import Any, Generic, TypeVar
+
+_LOGGER = logging.getLogger(__name__)
+
+_T = TypeVar("_T")
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+
+class TokenBucket:
+    """Client-side rate limiter allowing short bursts.
+
+    The limiter is off until engaged, after the server rejected a request
+    for exceeding its rate limit. It then starts with an empty bucket and
+    stays on until `hold` seconds after the last rejection.
+    """
+
+    def __init__(self, rate: float, capacity: int, hold: float) -> None:
+        """Initialize the bucket with `rate` tokens per second."""
+        self._rate = rate
+        self._capacity = capacity
+        self._hold = hold
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._active_until = 0.0
+        self._lock = asyncio.Lock()
+
+    @property
+    def active(self) -> bool:
+        """Return True while requests are limited."""
+        return time.monotonic() < self._active_until
+
+    def engage(self) -> None:
+        """Limit requests, after the server rejected one."""
+        now = time.monotonic()
+        if not self.active:
+            self._tokens = 0.0
+            self._updated = now
+        self._active_until = now + self._hold
+
+    def _refill(self) -> None:
+        """Add the tokens earned since the last refill."""
+        now = time.monotonic()
+        self._tokens = min(
+            self._capacity, self._tokens + (now - self._updated) * self._rate
+        )
+        self._updated = now
+
+    async def acquire(self) -> None:
+        """Wait until a request may be sent."""
+        if not self.active:
+            return
+        async with self._lock:
+            self._refill()
+            if self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) / self._rate)
+                self._refill()
+            self._tokens -= 1
+
+    @property
+    def tokens(self) -> float:
+        """Return the number of tokens currently available."""
+        self._refill()
+        return self._tokens
+
+
+class CircuitBreaker:
+    """Stop calling the backend while it keeps failing.
+
+    After `failure_threshold` consecutive failures the breaker opens and
+    calls are rejected. Once `reset_timeout` seconds passed, a single
+    trial call is let through; its outcome closes or reopens the breaker.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float) -> None:
+        """Initialize the breaker."""
+        self._failure_threshold = failure_threshold
+        self._reset_timeout = reset_timeout
+        self.state = STATE_CLOSED
+        self.consecutive_failures = 0
+        self.opened_count = 0
+        self._opened_at = 0.0
+
+    def allow_request(self) -> bool:
+        """Return True if a call may be made now."""
+        if self.state == STATE_CLOSED:
+            return True
+        if (
+            self.state == STATE_OPEN
+            and time.monotonic() - self._opened_at >= self._reset_timeout
+        ):
+            self.state = STATE_HALF_OPEN
+            return True
+        return False
+
+    def record_success(self) -> None:
+        """Record a call that reached the backend."""
+        if self.state != STATE_CLOSED:
+            _LOGGER.info("SmartShopr API reachable again, closing circuit")
+        self.state = STATE_CLOSED
+        self.consecutive_failures = 0
+
+    def record_failure(self) -> None:
+        """Record a call that failed because of the backend."""
+        self.consecutive_failures += 1
+        if self.state == STATE_HALF_OPEN or (
+            self.state == STATE_CLOSED
+            and self.consecutive_failures >= self._failure_threshold
+        ):
+            if self.state == STATE_CLOSED:
+                _LOGGER.warning(
+                    "SmartShopr API failed %d times in a row, pausing requests for %ds",
+                    self.consecutive_failures,
+                    self._reset_timeout,
+                )
+            self.state = STATE_OPEN
+            self.opened_count += 1
+            self._opened_at = time.monotonic()
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the breaker state for diagnostics."""
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "opened_count": self.opened_count,
+        }
+
+
+class SharedTasks(Generic[_T]):
+    """Run one task per key, awaited by every caller asking for that key.
+
+    The task is cancelled once all of its callers were cancelled, so work
+    nobody waits for any more does not go on in the background.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the tasks."""
+        self._tasks: dict[Hashable, asyncio.Task[_T]] = {}
+        self._waiters: dict[asyncio.Task[_T], int] = {}
+
+    def __contains__(self, key: Hashable) -> bool:
+        """Return True if a task for the key is running."""
+        return key in self._tasks
+
+    async def async_run(
+        self, key: Hashable, factory: Callable[[], Awaitable[_T]]
+    ) -> _T:
+        """Return the result of the task for key, started if not running."""
+        if (task := self._tasks.get(key)) is None:
+            task = asyncio.ensure_future(factory())
+            self._tasks[key] = task
+            task.add_done_callback(partial(self._done, key))
+        self._waiters[task] = self._waiters.get(task, 0) + 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if self._waiters[task] == 1:
+                # The last caller gave up
+                task.cancel()
+            raise
+        finally:
+            if (waiters := self._waiters[task] - 1) > 0:
+                self._waiters[task] = waiters
+            else:
+                del self._waiters[task]
+
+    def _done(self, key: Hashable, task: asyncio.Task[_T]) -> None:
+        """Forget a finished task."""
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+        if not task.cancelled():
+            # Retrieve the error, in case every caller was cancelled
+            task.exception()
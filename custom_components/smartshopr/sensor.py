@@ -10,13 +10,25 @@ from homeassistant.components.sensor import (
     SensorStateClass,
 )
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.const import CURRENCY_EURO
-from homeassistant.core import HomeAssistant
+from homeassistant.const import (
+    CURRENCY_EURO,
+    EntityCategory,
+    Platform,
+    UnitOfTime,
+)
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers import entity_registry as er
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
-from homeassistant.helpers.update_coordinator import CoordinatorEntity
+from homeassistant.util import dt as dt_util
 
 from .const import DOMAIN
-from .coordinator import SmartShoprDataUpdateCoordinator
+from .coordinator import (
+    SmartShoprData,
+    SmartShoprFinanceCoordinator,
+    SmartShoprListsCoordinator,
+)
+from .entity import SmartShoprEntity, async_reconcile_entities
+from .models import Budget
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -27,27 +39,76 @@ async def async_setup_entry(
     async_add_entities: AddEntitiesCallback,
 ) -> None:
     """Set up SmartShopr sensor entities."""
-    coordinator: SmartShoprDataUpdateCoordinator = hass.data[DOMAIN][entry.entry_id]
+    data: SmartShoprData = hass.data[DOMAIN][entry.entry_id]
+    coordinator = data.finance
 
     entities = []
 
     # Monthly expenses sensor
     entities.append(SmartShoprMonthlyExpensesSensor(coordinator))
 
-    # Budget sensors
-    for budget in coordinator.data.get("budgets", []):
-        entities.append(
-            SmartShoprBudgetSensor(
-                coordinator,
-                budget["id"],
-                budget["name"],
-            )
-        )
+    # Diagnostic sensors, disabled by default, one set per config entry
+    _async_migrate_diagnostic_unique_ids(hass, entry)
+    entities.append(SmartShoprRefreshDurationSensor(data.lists, entry.entry_id))
+    entities.append(SmartShoprRefreshRequestsSensor(data.lists, entry.entry_id))
+    entities.append(SmartShoprPendingWritesSensor(data.lists, entry.entry_id))
 
     async_add_entities(entities)
 
+    # Budget sensors, added and removed as budgets come and go
+    async_reconcile_entities(
+        hass,
+        entry,
+        coordinator,
+        Platform.SENSOR,
+        async_add_entities,
+        lambda snapshot: snapshot["budgets_by_id"],
+        lambda budget: SmartShoprBudgetSensor(coordinator, budget.id, budget.name),
+        _budget_unique_id,
+    )
+
+
+def _budget_unique_id(budget_id: str) -> str:
+    """Return the unique id of the sensor of a budget."""
+    return f"smartshopr_budget_{budget_id}"
+
+
+# Keys of the diagnostic sensors, first added with the unique id smartshopr_<key>
+DIAGNOSTIC_SENSOR_KEYS = (
+    "last_refresh_duration",
+    "requests_per_refresh",
+    "pending_writes",
+)
+
 
-class SmartShoprMonthlyExpensesSensor(CoordinatorEntity, SensorEntity):
+def _diagnostic_unique_id(entry_id: str, key: str) -> str:
+    """Return the unique id of a diagnostic sensor of a config entry."""
+    return f"smartshopr_{entry_id}_{key}"
+
+
+@callback
+def _async_migrate_diagnostic_unique_ids(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> None:
+    """Move diagnostic sensors of this entry to unique ids with the entry id."""
+    registry = er.async_get(hass)
+    for key in DIAGNOSTIC_SENSOR_KEYS:
+        entity_id = registry.async_get_entity_id(
+            Platform.SENSOR, DOMAIN, f"smartshopr_{key}"
+        )
+        if (
+            entity_id is not None
+            and (entity_entry := registry.async_get(entity_id)) is not None
+            and entity_entry.config_entry_id == entry.entry_id
+        ):
+            registry.async_update_entity(
+                entity_id, new_unique_id=_diagnostic_unique_id(entry.entry_id, key)
+            )
+
+
+class SmartShoprMonthlyExpensesSensor(
+    SmartShoprEntity[SmartShoprFinanceCoordinator], SensorEntity
+):
     """Sensor for monthly expenses."""
 
     _attr_has_entity_name = True
@@ -56,47 +117,49 @@ class SmartShoprMonthlyExpensesSensor(CoordinatorEntity, SensorEntity):
     _attr_native_unit_of_measurement = CURRENCY_EURO
     _attr_icon = "mdi:cash-register"
 
-    def __init__(self, coordinator: SmartShoprDataUpdateCoordinator) -> None:
+    def __init__(self, coordinator: SmartShoprFinanceCoordinator) -> None:
         """Initialize the sensor."""
         super().__init__(coordinator)
         self._attr_unique_id = "smartshopr_monthly_expenses"
         self._attr_name = "SmartShopr Monthly Expenses"
 
+    def _data_fingerprint(self) -> Any:
+        """Return the monthly expenses."""
+        return self.coordinator.data["expenses"]
+
     @property
     def native_value(self) -> float | None:
         """Return the state of the sensor."""
-        expenses = self.coordinator.data.get("expenses", {})
-        totals = expenses.get("totals", {})
-        # Return EUR total, or sum of all currencies
-        if "EUR" in totals:
-            return round(totals["EUR"], 2)
-        elif totals:
-            return round(sum(totals.values()), 2)
-        return 0.0
+        return self.coordinator.data["expenses"].total
 
     @property
     def extra_state_attributes(self) -> dict[str, Any]:
         """Return additional attributes."""
-        expenses = self.coordinator.data.get("expenses", {})
+        expenses = self.coordinator.data["expenses"]
         return {
-            "month": expenses.get("month"),
-            "expense_count": expenses.get("expense_count", 0),
-            "totals_by_currency": expenses.get("totals", {}),
+            "month": expenses.month,
+            "expense_count": expenses.expense_count,
+            "totals_by_currency": expenses.totals,
         }
 
 
-class SmartShoprBudgetSensor(CoordinatorEntity, SensorEntity):
-    """Sensor for a budget's remaining amount."""
+class SmartShoprBudgetSensor(
+    SmartShoprEntity[SmartShoprFinanceCoordinator], SensorEntity
+):
+    """Sensor for a budget's remaining amount.
+
+    Without a state class, the history of the spent amount is imported as
+    long-term statistics instead.
+    """
 
     _attr_has_entity_name = True
     _attr_device_class = SensorDeviceClass.MONETARY
-    _attr_state_class = SensorStateClass.MEASUREMENT
     _attr_native_unit_of_measurement = CURRENCY_EURO
     _attr_icon = "mdi:piggy-bank"
 
     def __init__(
         self,
-        coordinator: SmartShoprDataUpdateCoordinator,
+        coordinator: SmartShoprFinanceCoordinator,
         budget_id: str,
         budget_name: str,
     ) -> None:
@@ -104,16 +167,17 @@ class SmartShoprBudgetSensor(CoordinatorEntity, SensorEntity):
         super().__init__(coordinator)
         self._budget_id = budget_id
         self._budget_name = budget_name
-        self._attr_unique_id = f"smartshopr_budget_{budget_id}"
+        self._attr_unique_id = _budget_unique_id(budget_id)
         self._attr_name = f"Budget: {budget_name}"
 
+    def _data_fingerprint(self) -> Any:
+        """Return the data of this budget."""
+        return self._budget_data
+
     @property
-    def _budget_data(self) -> dict[str, Any] | None:
+    def _budget_data(self) -> Budget | None:
         """Get the budget data from coordinator."""
-        for budget in self.coordinator.data.get("budgets", []):
-            if budget["id"] == self._budget_id:
-                return budget
-        return None
+        return self.coordinator.data["budgets_by_id"].get(self._budget_id)
 
     @property
     def native_value(self) -> float | None:
@@ -121,7 +185,7 @@ class SmartShoprBudgetSensor(CoordinatorEntity, SensorEntity):
         budget = self._budget_data
         if budget is None:
             return None
-        return budget.get("remaining")
+        return budget.remaining
 
     @property
     def extra_state_attributes(self) -> dict[str, Any]:
@@ -131,18 +195,14 @@ class SmartShoprBudgetSensor(CoordinatorEntity, SensorEntity):
             return {}
 
         attrs = {
-            "budget_name": budget.get("name"),
-            "target_amount": budget.get("target_amount"),
-            "spent": budget.get("spent", 0),
-            "expense_count": budget.get("expense_count", 0),
-            "shared": budget.get("shared", False),
+            "budget_name": budget.name,
+            "target_amount": budget.target_amount,
+            "spent": budget.spent,
+            "expense_count": budget.expense_count,
+            "shared": budget.shared,
         }
-
-        # Calculate percentage used
-        target = budget.get("target_amount")
-        spent = budget.get("spent", 0)
-        if target and target > 0:
-            attrs["percentage_used"] = round((spent / target) * 100, 1)
+        if budget.percentage_used is not None:
+            attrs["percentage_used"] = round(budget.percentage_used, 1)
 
         return attrs
 
@@ -153,13 +213,127 @@ class SmartShoprBudgetSensor(CoordinatorEntity, SensorEntity):
         if budget is None:
             return "mdi:piggy-bank"
 
-        target = budget.get("target_amount")
-        spent = budget.get("spent", 0)
-
-        if target and target > 0:
-            percentage = (spent / target) * 100
+        percentage = budget.percentage_used
+        if percentage is not None:
             if percentage >= 100:
                 return "mdi:piggy-bank-outline"  # Over budget
             elif percentage >= 80:
                 return "mdi:alert-circle"  # Warning
         return "mdi:piggy-bank"
+
+
+class SmartShoprRefreshDurationSensor(
+    SmartShoprEntity[SmartShoprListsCoordinator], SensorEntity
+):
+    """Sensor for the duration of the last list refresh."""
+
+    _attr_has_entity_name = True
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_entity_registry_enabled_default = False
+    _attr_device_class = SensorDeviceClass.DURATION
+    _attr_state_class = SensorStateClass.MEASUREMENT
+    _attr_native_unit_of_measurement = UnitOfTime.SECONDS
+    _attr_icon = "mdi:timer-sync-outline"
+
+    def __init__(
+        self, coordinator: SmartShoprListsCoordinator, entry_id: str
+    ) -> None:
+        """Initialize the sensor."""
+        super().__init__(coordinator)
+        self._attr_unique_id = _diagnostic_unique_id(entry_id, "last_refresh_duration")
+        self._attr_name = "SmartShopr Last Refresh Duration"
+
+    def _data_fingerprint(self) -> Any:
+        """Return the refresh statistics."""
+        return (self.native_value, self.coordinator.last_refresh_lag)
+
+    @property
+    def native_value(self) -> float | None:
+        """Return the duration of the last refresh."""
+        duration = self.coordinator.last_refresh_duration
+        return round(duration, 3) if duration is not None else None
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any]:
+        """Return additional attributes."""
+        lag = self.coordinator.last_refresh_lag
+        return {
+            "lag": round(lag, 3) if lag is not None else None,
+            "refresh_timings": {
+                phase: round(seconds, 3)
+                for phase, seconds in self.coordinator.refresh_timings.items()
+            },
+        }
+
+
+class SmartShoprRefreshRequestsSensor(
+    SmartShoprEntity[SmartShoprListsCoordinator], SensorEntity
+):
+    """Sensor for the number of API requests of the last list refresh."""
+
+    _attr_has_entity_name = True
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_entity_registry_enabled_default = False
+    _attr_state_class = SensorStateClass.MEASUREMENT
+    _attr_icon = "mdi:swap-vertical"
+
+    def __init__(
+        self, coordinator: SmartShoprListsCoordinator, entry_id: str
+    ) -> None:
+        """Initialize the sensor."""
+        super().__init__(coordinator)
+        self._attr_unique_id = _diagnostic_unique_id(entry_id, "requests_per_refresh")
+        self._attr_name = "SmartShopr Requests Per Refresh"
+
+    def _data_fingerprint(self) -> Any:
+        """Return the request count."""
+        return self.native_value
+
+    @property
+    def native_value(self) -> int | None:
+        """Return the number of requests of the last refresh."""
+        return self.coordinator.last_refresh_requests
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any]:
+        """Return additional attributes."""
+        return {"total_requests": self.coordinator.client.metrics.requests}
+
+
+class SmartShoprPendingWritesSensor(
+    SmartShoprEntity[SmartShoprListsCoordinator], SensorEntity
+):
+    """Sensor for the number of todo writes waiting to be sent."""
+
+    _attr_has_entity_name = True
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_entity_registry_enabled_default = False
+    _attr_state_class = SensorStateClass.MEASUREMENT
+    _attr_icon = "mdi:tray-full"
+
+    def __init__(
+        self, coordinator: SmartShoprListsCoordinator, entry_id: str
+    ) -> None:
+        """Initialize the sensor."""
+        super().__init__(coordinator)
+        self._attr_unique_id = _diagnostic_unique_id(entry_id, "pending_writes")
+        self._attr_name = "SmartShopr Pending Writes"
+
+    def _data_fingerprint(self) -> Any:
+        """Return the queue depth and the time of the oldest write."""
+        return (self.native_value, self.coordinator.write_queue.oldest_created)
+
+    @property
+    def native_value(self) -> int:
+        """Return the number of writes waiting to be sent."""
+        return self.coordinator.write_queue.depth
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any]:
+        """Return additional attributes."""
+        oldest = self.coordinator.write_queue.oldest_created
+        return {
+            "oldest_write": dt_util.utc_from_timestamp(oldest).isoformat()
+            if oldest is not None
+            else None
+        }
@@ -0,0 +1,73 @@
+"""Services for SmartShopr."""
+from __future__ import annotations
+
+from typing import Any
+
+import voluptuous as vol
+
+from homeassistant.const import Platform
+from homeassistant.core import (
+    HomeAssistant,
+    ServiceCall,
+    ServiceResponse,
+    SupportsResponse,
+    callback,
+)
+from homeassistant.helpers import config_validation as cv, entity_registry as er
+
+from .const import DOMAIN
+from .coordinator import SmartShoprData
+from .todo import list_unique_id
+
+SERVICE_FIND_ITEM = "find_item"
+
+ATTR_NAME = "name"
+ATTR_INCLUDE_COMPLETED = "include_completed"
+
+FIND_ITEM_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_NAME): cv.string,
+        vol.Optional(ATTR_INCLUDE_COMPLETED, default=False): cv.boolean,
+    }
+)
+
+
+@callback
+def async_setup_services(hass: HomeAssistant) -> None:
+    """Register the SmartShopr services."""
+
+    @callback
+    def _async_find_item(call: ServiceCall) -> ServiceResponse:
+        """Return the lists that contain an item, from the loaded data."""
+        registry = er.async_get(hass)
+        include_completed = call.data[ATTR_INCLUDE_COMPLETED]
+        found: dict[str, dict[str, Any]] = {}
+        for data in hass.data.get(DOMAIN, {}).values():
+            if not isinstance(data, SmartShoprData) or data.lists.data is None:
+                continue
+            lists_by_id = data.lists.data["lists_by_id"]
+            for list_id, item in data.lists.item_index.find(call.data[ATTR_NAME]):
+                # Lists shared between config entries are reported once
+                if item.id in found or (item.is_completed and not include_completed):
+                    continue
+                found[item.id] = {
+                    "list_id": list_id,
+                    "list_name": lists_by_id[list_id].name,
+                    "entity_id": registry.async_get_entity_id(
+                        Platform.TODO, DOMAIN, list_unique_id(list_id)
+                    ),
+                    "item_id": item.id,
+                    "summary": item.summary,
+                    "quantity_value": item.quantity_value,
+                    "quantity_unit": item.quantity_unit,
+                    "is_completed": item.is_completed,
+                }
+        return {"items": list(found.values())}
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_FIND_ITEM,
+        _async_find_item,
+        schema=FIND_ITEM_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
@@ -0,0 +1,48 @@
+"""Persistent snapshot of the SmartShopr data."""
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+
+from .const import DOMAIN, SNAPSHOT_SAVE_DELAY, STORAGE_VERSION
+from .coordinator import SmartShoprData
+
+
+class SmartShoprSnapshotStore:
+    """Keep the last good data of a config entry across restarts."""
+
+    def __init__(self, hass: HomeAssistant, entry_id: str) -> None:
+        """Initialize the store."""
+        self._store: Store[dict[str, Any]] = Store(
+            hass, STORAGE_VERSION, f"{DOMAIN}.{entry_id}.snapshot"
+        )
+
+    async def async_load(self) -> dict[str, Any] | None:
+        """Load the persisted snapshot, if there is one."""
+        return await self._store.async_load()
+
+    @callback
+    def async_schedule_save(self, data: SmartShoprData) -> None:
+        """Save the current data, after SNAPSHOT_SAVE_DELAY seconds."""
+
+        def _data_to_save() -> dict[str, Any]:
+            snapshot: dict[str, Any] = {}
+            if data.lists.data is not None:
+                snapshot["lists"] = [
+                    shopping_list.as_dict() for shopping_list in data.lists.data["lists"]
+                ]
+                snapshot["list_markers"] = data.lists.list_markers
+            if data.finance.data is not None:
+                snapshot["budgets"] = [
+                    budget.as_dict() for budget in data.finance.data["budgets"]
+                ]
+                snapshot["expenses"] = data.finance.data["expenses"].as_dict()
+            return snapshot
+
+        self._store.async_delay_save(_data_to_save, SNAPSHOT_SAVE_DELAY)
+
+    async def async_remove(self) -> None:
+        """Remove the persisted snapshot."""
+        await self._store.async_remove()
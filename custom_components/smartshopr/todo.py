@@ -11,12 +11,15 @@ from homeassistant.components.todo import (
     TodoListEntityFeature,
 )
 from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import Platform
 from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
-from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
-from .const import DOMAIN
-from .coordinator import SmartShoprDataUpdateCoordinator
+from .const import CONF_MERGE_DUPLICATES, DEFAULT_MERGE_DUPLICATES, DOMAIN
+from .coordinator import SmartShoprData, SmartShoprListsCoordinator
+from .entity import SmartShoprEntity, async_reconcile_entities
+from .models import ListItem
+from .write_queue import SmartShoprWriteQueue
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -27,23 +30,50 @@ async def async_setup_entry(
     async_add_entities: AddEntitiesCallback,
 ) -> None:
     """Set up SmartShopr todo entities."""
-    coordinator: SmartShoprDataUpdateCoordinator = hass.data[DOMAIN][entry.entry_id]
-
-    entities = []
-    for shopping_list in coordinator.data.get("lists", []):
-        entities.append(
-            SmartShoprTodoListEntity(
-                coordinator,
-                shopping_list["id"],
-                shopping_list["name"],
-                shopping_list.get("shared", False),
-            )
-        )
+    data: SmartShoprData = hass.data[DOMAIN][entry.entry_id]
+    coordinator = data.lists
+    merge_duplicates = entry.options.get(
+        CONF_MERGE_DUPLICATES, DEFAULT_MERGE_DUPLICATES
+    )
+
+    # Lists created or deleted in the app are added and removed on refresh
+    async_reconcile_entities(
+        hass,
+        entry,
+        coordinator,
+        Platform.TODO,
+        async_add_entities,
+        lambda snapshot: snapshot["lists_by_id"],
+        lambda shopping_list: SmartShoprTodoListEntity(
+            coordinator,
+            shopping_list.id,
+            shopping_list.name,
+            shopping_list.shared,
+            merge_duplicates,
+        ),
+        list_unique_id,
+    )
 
-    async_add_entities(entities)
+
+def list_unique_id(list_id: str) -> str:
+    """Return the unique id of the entity of a list."""
+    return f"smartshopr_list_{list_id}"
+
+
+def _to_todo_item(item: ListItem) -> TodoItem:
+    """Convert an API item to a todo item."""
+    return TodoItem(
+        uid=item.id,
+        summary=item.summary,
+        status=TodoItemStatus.COMPLETED
+        if item.is_completed
+        else TodoItemStatus.NEEDS_ACTION,
+    )
 
 
-class SmartShoprTodoListEntity(CoordinatorEntity, TodoListEntity):
+class SmartShoprTodoListEntity(
+    SmartShoprEntity[SmartShoprListsCoordinator], TodoListEntity
+):
     """A SmartShopr shopping list as a todo entity."""
 
     _attr_has_entity_name = True
@@ -55,57 +85,54 @@ class SmartShoprTodoListEntity(CoordinatorEntity, TodoListEntity):
 
     def __init__(
         self,
-        coordinator: SmartShoprDataUpdateCoordinator,
+        coordinator: SmartShoprListsCoordinator,
         list_id: str,
         list_name: str,
         is_shared: bool,
+        merge_duplicates: bool = DEFAULT_MERGE_DUPLICATES,
     ) -> None:
         """Initialize the todo list entity."""
         super().__init__(coordinator)
         self._list_id = list_id
         self._list_name = list_name
         self._is_shared = is_shared
-        self._attr_unique_id = f"smartshopr_list_{list_id}"
+        self._merge_duplicates = merge_duplicates
+        self._attr_unique_id = list_unique_id(list_id)
         self._attr_name = list_name
+        # Items tuple the cached todo items were built from
+        self._cached_raw_items: tuple[ListItem, ...] | None = None
+        self._cached_todo_items: list[TodoItem] = []
+
+    @property
+    def _write_queue(self) -> SmartShoprWriteQueue:
+        """Return the queue todo writes go through."""
+        return self.coordinator.write_queue
 
     @property
     def icon(self) -> str:
         """Return the icon."""
         return "mdi:cart" if not self._is_shared else "mdi:cart-heart"
 
+    def _data_fingerprint(self) -> Any:
+        """Return the items of this list."""
+        shopping_list = self.coordinator.data["lists_by_id"].get(self._list_id)
+        if shopping_list is None:
+            return None
+        return shopping_list.items
+
     @property
     def todo_items(self) -> list[TodoItem]:
         """Return the todo items."""
-        items = []
-        for shopping_list in self.coordinator.data.get("lists", []):
-            if shopping_list["id"] == self._list_id:
-                for item in shopping_list.get("items", []):
-                    status = (
-                        TodoItemStatus.COMPLETED
-                        if item.get("is_completed")
-                        else TodoItemStatus.NEEDS_ACTION
-                    )
-                    # Format name with quantity if > 1
-                    name = item["name"]
-                    qty = item.get("quantity_value", 1)
-                    unit = item.get("quantity_unit")
-                    if qty > 1:
-                        if unit:
-                            name = f"{name} ({qty} {unit})"
-                        else:
-                            name = f"{name} (x{qty})"
-                    elif unit:
-                        name = f"{name} ({unit})"
-
-                    items.append(
-                        TodoItem(
-                            uid=item["id"],
-                            summary=name,
-                            status=status,
-                        )
-                    )
-                break
-        return items
+        shopping_list = self.coordinator.data["lists_by_id"].get(self._list_id)
+        if shopping_list is None:
+            return []
+
+        # The coordinator keeps the same items tuple while a list is unchanged
+        raw_items = shopping_list.items
+        if raw_items is not self._cached_raw_items:
+            self._cached_todo_items = [_to_todo_item(item) for item in raw_items]
+            self._cached_raw_items = raw_items
+        return self._cached_todo_items
 
     async def async_create_todo_item(self, item: TodoItem) -> None:
         """Create a new todo item."""
@@ -126,24 +153,32 @@ class SmartShoprTodoListEntity(CoordinatorEntity, TodoListEntity):
             quantity = int(parts[0])
             name = parts[1]
 
-        await self.coordinator.client.add_item(
-            self._list_id,
-            name,
-            quantity,
+        # Add to the quantity of the same item if it is still open, unless
+        # the quantity has a unit the added quantity would not match
+        existing = (
+            self.coordinator.item_index.find_open(self._list_id, name)
+            if self._merge_duplicates
+            else None
         )
-        await self.coordinator.async_request_refresh()
+        if existing is not None and existing.quantity_unit is None:
+            await self._write_queue.async_update_item(
+                self._list_id,
+                existing.id,
+                quantity_value=existing.quantity_value + quantity,
+            )
+            return
+
+        # Writes are queued and sent in the background
+        await self._write_queue.async_add_item(self._list_id, name, quantity)
 
     async def async_update_todo_item(self, item: TodoItem) -> None:
         """Update a todo item."""
-        is_completed = item.status == TodoItemStatus.COMPLETED
-        await self.coordinator.client.update_item(
+        await self._write_queue.async_update_item(
+            self._list_id,
             item.uid,
-            is_completed=is_completed,
+            is_completed=item.status == TodoItemStatus.COMPLETED,
         )
-        await self.coordinator.async_request_refresh()
 
     async def async_delete_todo_items(self, uids: list[str]) -> None:
         """Delete todo items."""
-        for uid in uids:
-            await self.coordinator.client.delete_item(uid)
-        await self.coordinator.async_request_refresh()
+        await self._write_queue.async_delete_items(self._list_id, uids)
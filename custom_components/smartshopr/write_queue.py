@@ -0,0 +1,503 @@
+"""Persistent queue of todo writes for SmartShopr."""
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass, field, replace
+import logging
+import time
+from typing import Any
+import uuid
+
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.event import async_call_later
+from homeassistant.helpers.storage import Store
+
+from .api import (
+    SmartShoprApiClient,
+    SmartShoprApiError,
+    SmartShoprAuthError,
+    SmartShoprCircuitOpenError,
+    SmartShoprConnectionError,
+    SmartShoprRateLimitError,
+)
+from .const import (
+    DOMAIN,
+    STORAGE_VERSION,
+    WRITE_COALESCE_WINDOW,
+    WRITE_QUEUE_RETRY_INTERVAL,
+)
+from .coordinator import SmartShoprListsCoordinator
+from .models import ListItem
+
+_LOGGER = logging.getLogger(__name__)
+
+OP_ADD = "add"
+OP_UPDATE = "update"
+OP_DELETE = "delete"
+
+# Prefix of the ids of items that were not created on the server yet
+PENDING_ID_PREFIX = "pending-"
+
+# Errors after which a write is kept and sent again later
+_RETRYABLE_ERRORS = (
+    SmartShoprAuthError,
+    SmartShoprCircuitOpenError,
+    SmartShoprConnectionError,
+    SmartShoprRateLimitError,
+)
+
+
+@dataclass(slots=True)
+class PendingWrite:
+    """A todo write that was not sent to the API yet."""
+
+    key: str  # Idempotency key
+    op: str
+    list_id: str
+    item_id: str
+    fields: dict[str, Any] = field(default_factory=dict)
+    created: float = 0.0  # Unix time
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> PendingWrite:
+        """Create a write from its stored representation."""
+        return cls(**data)
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the stored representation of the write."""
+        return {
+            "key": self.key,
+            "op": self.op,
+            "list_id": self.list_id,
+            "item_id": self.item_id,
+            "fields": self.fields,
+            "created": self.created,
+        }
+
+
+def compact(entries: list[PendingWrite]) -> list[PendingWrite]:
+    """Drop writes made obsolete by later ones.
+
+    A delete cancels earlier updates of the item, and an item added and
+    deleted again is not sent at all. Updates of the same item are merged
+    into the last one.
+    """
+    result: list[PendingWrite] = []
+    for entry in entries:
+        if entry.op == OP_DELETE:
+            added_here = any(
+                other.op == OP_ADD and other.item_id == entry.item_id
+                for other in result
+            )
+            result = [other for other in result if other.item_id != entry.item_id]
+            if not added_here:
+                result.append(entry)
+        elif entry.op == OP_UPDATE:
+            fields: dict[str, Any] = {}
+            kept = []
+            for other in result:
+                if other.op == OP_UPDATE and other.item_id == entry.item_id:
+                    fields.update(other.fields)
+                else:
+                    kept.append(other)
+            fields.update(entry.fields)
+            result = [*kept, replace(entry, fields=fields)]
+        else:
+            result.append(entry)
+    return result
+
+
+def _storage_key(entry_id: str) -> str:
+    """Return the storage key of the queue of a config entry."""
+    return f"{DOMAIN}.{entry_id}.write_queue"
+
+
+async def async_remove_write_queue(hass: HomeAssistant, entry_id: str) -> None:
+    """Remove the stored queue of a removed config entry."""
+    await Store(hass, STORAGE_VERSION, _storage_key(entry_id)).async_remove()
+
+
+def _pending_item(entry: PendingWrite) -> ListItem:
+    """Return the item shown for an add that was not sent yet."""
+    return ListItem(
+        id=entry.item_id,
+        name=entry.fields["name"],
+        quantity_value=entry.fields.get("quantity_value", 1),
+        list_id=entry.list_id,
+    )
+
+
+class SmartShoprWriteQueue:
+    """Record todo writes in storage and send them in order.
+
+    Writes are applied to the coordinator data and acknowledged right
+    away. They are sent in the background once no write arrived for a
+    moment, so quick successive writes are merged, and kept for a later
+    attempt while the API is unreachable. Until they are sent they are also
+    applied on top of every refresh.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        entry_id: str,
+        client: SmartShoprApiClient,
+        coordinator: SmartShoprListsCoordinator,
+    ) -> None:
+        """Initialize the queue."""
+        self.hass = hass
+        self.client = client
+        self.coordinator = coordinator
+        self._store: Store[dict[str, Any]] = Store(
+            hass, STORAGE_VERSION, _storage_key(entry_id)
+        )
+        self._entries: list[PendingWrite] = []
+        self._replay_task: asyncio.Task | None = None
+        self._retry_unsub: CALLBACK_TYPE | None = None
+        self._coalesce_unsub: CALLBACK_TYPE | None = None
+        self.sent = 0
+        self.dropped = 0
+
+    @property
+    def depth(self) -> int:
+        """Return the number of writes waiting to be sent."""
+        return len(self._entries)
+
+    @property
+    def oldest_created(self) -> float | None:
+        """Return when the oldest waiting write was made, as Unix time."""
+        if not self._entries:
+            return None
+        return min(entry.created for entry in self._entries)
+
+    @property
+    def oldest_age(self) -> float | None:
+        """Return the age in seconds of the oldest waiting write."""
+        if (oldest := self.oldest_created) is None:
+            return None
+        return max(time.time() - oldest, 0.0)
+
+    async def async_load(self) -> None:
+        """Load the writes left over from the last run."""
+        if (data := await self._store.async_load()) is not None:
+            self._entries = [
+                PendingWrite.from_dict(entry) for entry in data.get("entries", [])
+            ]
+
+    def _data_to_save(self) -> dict[str, Any]:
+        """Return the data to store."""
+        return {"entries": [entry.as_dict() for entry in self._entries]}
+
+    async def async_add_item(
+        self, list_id: str, name: str, quantity_value: int
+    ) -> ListItem:
+        """Queue a new item and return the item shown until it is sent."""
+        key = uuid.uuid4().hex
+        entry = PendingWrite(
+            key=key,
+            op=OP_ADD,
+            list_id=list_id,
+            item_id=f"{PENDING_ID_PREFIX}{key}",
+            fields={"name": name, "quantity_value": quantity_value},
+            created=time.time(),
+        )
+        item = _pending_item(entry)
+        self.coordinator.async_upsert_item(list_id, item)
+        await self._async_append([entry])
+        return item
+
+    async def async_update_item(
+        self, list_id: str, item_id: str, **fields: Any
+    ) -> None:
+        """Queue an update of an item."""
+        if (item := self.coordinator.data["items_by_id"].get(item_id)) is not None:
+            self.coordinator.async_upsert_item(list_id, replace(item, **fields))
+        await self._async_append(
+            [
+                PendingWrite(
+                    key=uuid.uuid4().hex,
+                    op=OP_UPDATE,
+                    list_id=list_id,
+                    item_id=item_id,
+                    fields=fields,
+                    created=time.time(),
+                )
+            ]
+        )
+
+    async def async_delete_items(self, list_id: str, item_ids: list[str]) -> None:
+        """Queue the deletion of items."""
+        self.coordinator.async_remove_items(list_id, item_ids)
+        now = time.time()
+        await self._async_append(
+            [
+                PendingWrite(
+                    key=uuid.uuid4().hex,
+                    op=OP_DELETE,
+                    list_id=list_id,
+                    item_id=item_id,
+                    created=now,
+                )
+                for item_id in item_ids
+            ]
+        )
+
+    async def _async_append(self, entries: list[PendingWrite]) -> None:
+        """Store new writes and start sending them."""
+        # Writes being sent are not compacted, the replay removes them itself
+        if self._replay_task is not None and self._entries:
+            head, rest = self._entries[:1], self._entries[1:]
+        else:
+            head, rest = [], self._entries
+        self._entries = head + compact(rest + entries)
+        await self._store.async_save(self._data_to_save())
+        self.coordinator.async_update_listeners()
+        if self._replay_task is None:
+            # Wait until no write arrived for a window, the writes are
+            # compacted with each other until then
+            if self._coalesce_unsub is not None:
+                self._coalesce_unsub()
+            self._coalesce_unsub = async_call_later(
+                self.hass, WRITE_COALESCE_WINDOW, self._async_coalesce_done
+            )
+
+    @callback
+    def _async_coalesce_done(self, _now: Any) -> None:
+        """Send the writes collected during the coalesce window."""
+        self._coalesce_unsub = None
+        self.async_schedule_replay()
+
+    @callback
+    def apply_pending(
+        self, list_id: str, items: tuple[ListItem, ...]
+    ) -> tuple[ListItem, ...]:
+        """Return the items of a list with the waiting writes applied."""
+        entries = [entry for entry in self._entries if entry.list_id == list_id]
+        if not entries:
+            return items
+        result = list(items)
+        for entry in entries:
+            ids = [item.id for item in result]
+            if entry.op == OP_ADD:
+                if entry.item_id not in ids:
+                    result.append(_pending_item(entry))
+            elif entry.item_id in ids:
+                index = ids.index(entry.item_id)
+                if entry.op == OP_UPDATE:
+                    result[index] = replace(result[index], **entry.fields)
+                else:
+                    del result[index]
+        return tuple(result)
+
+    @callback
+    def async_schedule_replay(self) -> None:
+        """Start sending the waiting writes, unless already running."""
+        if not self._entries or self._replay_task is not None:
+            return
+        if self._retry_unsub is not None:
+            self._retry_unsub()
+            self._retry_unsub = None
+        if self._coalesce_unsub is not None:
+            self._coalesce_unsub()
+            self._coalesce_unsub = None
+        self._replay_task = self.hass.async_create_background_task(
+            self._async_replay(), f"{DOMAIN} write queue"
+        )
+        self._replay_task.add_done_callback(self._replay_done)
+
+    @callback
+    def _replay_done(self, task: asyncio.Task) -> None:
+        """Forget the finished replay and start another for new writes."""
+        self._replay_task = None
+        if task.cancelled() or self._retry_unsub is not None:
+            return
+        if (err := task.exception()) is not None:
+            _LOGGER.error("Sending queued SmartShopr writes failed", exc_info=err)
+            self._retry_unsub = async_call_later(
+                self.hass, WRITE_QUEUE_RETRY_INTERVAL, self._async_retry
+            )
+            return
+        self.async_schedule_replay()
+
+    async def async_drain(self) -> None:
+        """Wait until the writes queued so far were sent or put aside."""
+        if self._coalesce_unsub is not None:
+            # Without waiting for the end of the coalesce window
+            self.async_schedule_replay()
+        while (task := self._replay_task) is not None:
+            await asyncio.wait([task])
+            # Let the done callback start the replay of newer writes
+            await asyncio.sleep(0)
+
+    @callback
+    def async_shutdown(self) -> None:
+        """Stop sending, the waiting writes stay stored."""
+        if self._retry_unsub is not None:
+            self._retry_unsub()
+            self._retry_unsub = None
+        if self._coalesce_unsub is not None:
+            self._coalesce_unsub()
+            self._coalesce_unsub = None
+        if self._replay_task is not None:
+            self._replay_task.cancel()
+
+    async def _async_replay(self) -> None:
+        """Send the waiting writes in order."""
+        while self._entries:
+            first = self._entries[0]
+            if first.op == OP_ADD:
+                batch = [first]
+            else:
+                # Consecutive updates or deletes are sent together
+                batch = []
+                for entry in self._entries:
+                    if entry.op != first.op or entry.item_id.startswith(
+                        PENDING_ID_PREFIX
+                    ):
+                        break
+                    batch.append(entry)
+                if not batch:
+                    # The add of the item is gone, it never got a real id
+                    self._drop_item_writes(
+                        first.item_id, SmartShoprApiError("Item was never created")
+                    )
+                    continue
+
+            if not await self._async_send(batch):
+                self._retry_unsub = async_call_later(
+                    self.hass, WRITE_QUEUE_RETRY_INTERVAL, self._async_retry
+                )
+                break
+            self.coordinator.async_update_listeners()
+
+    @callback
+    def _async_retry(self, _now: Any) -> None:
+        """Try sending the waiting writes again."""
+        self._retry_unsub = None
+        self.async_schedule_replay()
+
+    @callback
+    def _remove_sent(self, batch: list[PendingWrite]) -> None:
+        """Remove writes that were sent or put aside."""
+        sent = {id(entry) for entry in batch}
+        self._entries = [entry for entry in self._entries if id(entry) not in sent]
+        self._store.async_delay_save(self._data_to_save, 1)
+
+    @callback
+    def async_show_item(
+        self, list_id: str, item: ListItem, replaces: str | None = None
+    ) -> None:
+        """Show an item sent by the API, with the waiting writes applied.
+
+        Without this an item deleted or changed again while a write was
+        being sent would briefly show its old state.
+        """
+        shown: ListItem | None = item
+        for entry in self._entries:
+            if entry.item_id != item.id or shown is None:
+                continue
+            if entry.op == OP_UPDATE:
+                shown = replace(shown, **entry.fields)
+            elif entry.op == OP_DELETE:
+                shown = None
+        if shown is None:
+            self.coordinator.async_remove_items(
+                list_id, [item.id] if replaces is None else [item.id, replaces]
+            )
+        elif replaces is not None:
+            self.coordinator.async_replace_item(list_id, replaces, shown)
+        else:
+            self.coordinator.async_upsert_item(list_id, shown)
+
+    async def _async_send(self, batch: list[PendingWrite]) -> bool:
+        """Send a batch of writes, return False if it has to be retried."""
+        first = batch[0]
+        try:
+            if first.op == OP_ADD:
+                await self._async_send_add(first)
+                return True
+            if first.op == OP_UPDATE:
+                outcomes = await self.client.update_items(
+                    {entry.item_id: entry.fields for entry in batch}
+                )
+            else:
+                outcomes = await self.client.delete_items(
+                    [entry.item_id for entry in batch]
+                )
+        except _RETRYABLE_ERRORS as err:
+            _LOGGER.debug("Keeping %d queued writes: %s", len(batch), err)
+            return False
+
+        if any(isinstance(outcome, _RETRYABLE_ERRORS) for outcome in outcomes.values()):
+            # Keep the whole batch, updates and deletes can be sent twice
+            return False
+        self._remove_sent(batch)
+        for entry in batch:
+            outcome = outcomes.get(entry.item_id)
+            if isinstance(outcome, ListItem):
+                self.async_show_item(entry.list_id, outcome)
+            elif isinstance(outcome, SmartShoprApiError):
+                self._drop(entry, outcome)
+        self.sent += len(batch)
+        return True
+
+    async def _async_send_add(self, entry: PendingWrite) -> None:
+        """Send a queued add and replace the pending item by the new one."""
+        try:
+            item = await self.client.add_item(
+                entry.list_id,
+                entry.fields["name"],
+                entry.fields.get("quantity_value", 1),
+                idempotency_key=entry.key,
+            )
+        except _RETRYABLE_ERRORS:
+            raise
+        except SmartShoprApiError as err:
+            self._remove_sent([entry])
+            self.coordinator.async_remove_items(entry.list_id, [entry.item_id])
+            self._drop(entry, err)
+            # Writes to the item cannot be sent either
+            self._drop_item_writes(entry.item_id, err)
+            return
+
+        self._remove_sent([entry])
+        self.sent += 1
+        if item is None:
+            # The id of the new item is unknown, the refresh shows it
+            self._drop_item_writes(
+                entry.item_id, SmartShoprApiError("No item in the add response")
+            )
+            self.hass.async_create_task(self.coordinator.async_request_refresh())
+            return
+        for other in self._entries:
+            if other.item_id == entry.item_id:
+                other.item_id = item.id
+        self.async_show_item(entry.list_id, item, replaces=entry.item_id)
+
+    @callback
+    def _drop(self, entry: PendingWrite, err: SmartShoprApiError) -> None:
+        """Give up on a write the API rejected."""
+        self.dropped += 1
+        _LOGGER.warning(
+            "SmartShopr rejected queued %s of item %s: %s", entry.op, entry.item_id, err
+        )
+        # Undo what was shown for the write, the list marker did not change
+        self.coordinator.async_invalidate_list(entry.list_id)
+        self.hass.async_create_task(self.coordinator.async_request_refresh())
+
+    @callback
+    def _drop_item_writes(self, item_id: str, err: SmartShoprApiError) -> None:
+        """Give up on the waiting writes of an item that was not created."""
+        entries = [entry for entry in self._entries if entry.item_id == item_id]
+        self._remove_sent(entries)
+        for entry in entries:
+            self._drop(entry, err)
+
+    def as_diagnostics(self) -> dict[str, Any]:
+        """Return the queue state for diagnostics."""
+        return {
+            "depth": self.depth,
+            "oldest_age": round(age, 1) if (age := self.oldest_age) is not None else None,
+            "sent": self.sent,
+            "dropped": self.dropped,
+        }
@@ -0,0 +1,56 @@
+"""Fixtures for SmartShopr tests."""
+from __future__ import annotations
+
+from collections.abc import AsyncIterator
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from benchmarks.fake_server import (
+    FakeServerConfig,
+    FakeSmartShoprBackend,
+    start_server,
+)
+from custom_components.smartshopr import api
+from custom_components.smartshopr.models import ListItem
+
+pytest_plugins = "pytest_homeassistant_custom_component"
+
+
+@pytest.fixture
+def client() -> MagicMock:
+    """Return an API client that accepts every write."""
+    client = MagicMock()
+    client.add_item = AsyncMock(
+        side_effect=lambda list_id, name, quantity_value=1, **kwargs: ListItem(
+            id=f"id-{name}", name=name, quantity_value=quantity_value, list_id=list_id
+        )
+    )
+    client.update_items = AsyncMock(
+        side_effect=lambda updates: {item_id: None for item_id in updates}
+    )
+    client.delete_items = AsyncMock(
+        side_effect=lambda item_ids: {item_id: None for item_id in item_ids}
+    )
+    return client
+
+
+@pytest.fixture
+def coordinator() -> MagicMock:
+    """Return a lists coordinator without items."""
+    coordinator = MagicMock()
+    coordinator.data = {"items_by_id": {}}
+    coordinator.async_request_refresh = AsyncMock()
+    return coordinator
+
+
+@pytest.fixture
+async def backend(socket_enabled: None) -> AsyncIterator[FakeSmartShoprBackend]:
+    """Serve two lists of 450 items from the benchmark backend."""
+    backend = FakeSmartShoprBackend(
+        FakeServerConfig(lists=2, items_per_list=450, latency=0)
+    )
+    runner, base_url = await start_server(backend)
+    with patch.object(api, "API_BASE_URL", base_url):
+        yield backend
+    await runner.cleanup()
@@ -0,0 +1,102 @@
+"""Tests for the SmartShopr API client."""
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+import time
+from unittest.mock import patch
+
+import aiohttp
+from homeassistant.util import dt as dt_util
+import pytest
+
+from benchmarks.fake_server import FakeSmartShoprBackend
+from custom_components.smartshopr.api import (
+    SmartShoprApiClient,
+    SmartShoprRequestError,
+    _parse_retry_after,
+)
+from custom_components.smartshopr.resilience import STATE_OPEN
+
+
+async def test_item_pages_cached_by_position(backend: FakeSmartShoprBackend) -> None:
+    """Item pages are cached by list and page, and dropped when gone."""
+    async with aiohttp.ClientSession() as session:
+        client = SmartShoprApiClient("sk_live_test", session)
+        items = await client.get_list_items("list-0")
+        assert len(items) == 450
+        await client.get_list_items("list-1")
+        assert sorted(client._validators) == [
+            f"lists/{list_id}/items#{page}"
+            for list_id in ("list-0", "list-1")
+            for page in range(3)
+        ]
+
+        # A new completed_since does not make the pages unknown
+        backend.stats.reset()
+        since = datetime(2026, 10, 1, tzinfo=timezone.utc)
+        pages = [item async for item in client.iter_list_items("list-0", 200, since)]
+        assert len(pages) == 450
+        assert backend.stats.not_modified == 3
+
+        # Pages after the end of a shrunk list are forgotten
+        del backend.items["list-0"][150:]
+        assert len(await client.get_list_items("list-0")) == 150
+        assert [
+            key for key in client._validators if key.startswith("lists/list-0")
+        ] == ["lists/list-0/items#0"]
+
+        # Pages of deleted lists are forgotten
+        del backend.lists["list-1"]
+        await client.get_lists()
+        assert not any(key.startswith("lists/list-1") for key in client._validators)
+
+
+async def test_batch_probe_rejected(backend: FakeSmartShoprBackend) -> None:
+    """A server answering the batch probe with 405 gets single writes."""
+    async with aiohttp.ClientSession() as session:
+        client = SmartShoprApiClient("sk_live_test", session)
+        item_ids = [item["id"] for item in backend.items["list-0"][:2]]
+        outcomes = await client.update_items(
+            {item_id: {"is_completed": True} for item_id in item_ids}
+        )
+        assert [outcome.is_completed for outcome in outcomes.values()] == [True, True]
+        assert client._batch_supported is False
+        assert all(item["is_completed"] for item in backend.items["list-0"][:2])
+
+
+async def test_snapshot_probe_rejected(backend: FakeSmartShoprBackend) -> None:
+    """A server answering the snapshot probe with 400 has no snapshot."""
+    async with aiohttp.ClientSession() as session:
+        client = SmartShoprApiClient("sk_live_test", session)
+        with patch.object(
+            client,
+            "_request",
+            side_effect=SmartShoprRequestError("Unknown route", 400),
+        ) as request:
+            assert await client.get_snapshot() is None
+            assert await client.get_snapshot() is None
+        assert request.call_count == 1
+
+
+def test_retry_after_date_without_zone() -> None:
+    """A Retry-After date with a -0000 zone is taken as UTC."""
+    retry_at = dt_util.utcnow() + timedelta(seconds=30)
+    delay = _parse_retry_after(format_datetime(retry_at.replace(tzinfo=None)))
+    assert delay is not None
+    assert 25 <= delay <= 30
+
+
+async def test_unexpected_error_ends_trial_request() -> None:
+    """An unexpected error of the trial request opens the breaker again."""
+    async with aiohttp.ClientSession() as session:
+        client = SmartShoprApiClient("sk_live_test", session)
+        # Open long enough ago for a trial request
+        client.breaker.state = STATE_OPEN
+        client.breaker._opened_at = time.monotonic() - 3600
+        with patch.object(
+            client, "_request_once", side_effect=RuntimeError("Unexpected")
+        ), pytest.raises(RuntimeError):
+            await client.get_lists()
+        assert client.breaker.state == STATE_OPEN
+        assert not client.breaker.allow_request()
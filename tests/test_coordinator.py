@@ -0,0 +1,110 @@
+"""Tests for the SmartShopr coordinators."""
+from __future__ import annotations
+
+from datetime import timedelta
+from unittest.mock import patch
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+
+from benchmarks.fake_server import FakeSmartShoprBackend
+from custom_components.smartshopr.api import (
+    SmartShoprApiClient,
+    SmartShoprConnectionError,
+)
+from custom_components.smartshopr.const import (
+    DEFAULT_MAX_SCAN_INTERVAL,
+    DEFAULT_MIN_SCAN_INTERVAL,
+    ERROR_JITTER,
+    FULL_SYNC_EVERY,
+    IDLE_BACKOFF_FACTOR,
+)
+from custom_components.smartshopr.coordinator import SmartShoprListsCoordinator
+
+ITEMS = "lists/{id}/items"
+
+
+def _lists_coordinator(hass: HomeAssistant) -> SmartShoprListsCoordinator:
+    """Return a lists coordinator talking to the fake backend."""
+    client = SmartShoprApiClient("sk_live_test", async_get_clientsession(hass))
+    return SmartShoprListsCoordinator(hass, client)
+
+
+async def test_incremental_sync(
+    hass: HomeAssistant, backend: FakeSmartShoprBackend
+) -> None:
+    """Only changed lists are fetched, and all of them now and then."""
+    coordinator = _lists_coordinator(hass)
+    await coordinator.async_refresh()
+    # Two lists of three pages
+    assert backend.stats.by_endpoint[ITEMS] == 6
+
+    backend.stats.reset()
+    await coordinator.async_refresh()
+    assert backend.stats.by_endpoint == {"lists": 1}
+
+    changed = backend.change_random_item()
+    (unchanged,) = set(backend.lists) - {changed}
+    unchanged_items = coordinator.data["lists_by_id"][unchanged].items
+    backend.stats.reset()
+    await coordinator.async_refresh()
+    assert backend.stats.by_endpoint == {"lists": 1, ITEMS: 3}
+    assert coordinator.data["lists_by_id"][unchanged].items is unchanged_items
+    assert [
+        item.is_completed for item in coordinator.data["lists_by_id"][changed].items
+    ] == [item["is_completed"] for item in backend.items[changed]]
+
+    for _ in range(FULL_SYNC_EVERY - 2):
+        await coordinator.async_refresh()
+    backend.stats.reset()
+    await coordinator.async_refresh()
+    # Every list is checked again, the unchanged pages are not sent
+    assert backend.stats.by_endpoint == {"lists": 1, ITEMS: 6}
+    assert backend.stats.not_modified == 7
+
+
+async def test_interval_decay_and_error_backoff(
+    hass: HomeAssistant, backend: FakeSmartShoprBackend
+) -> None:
+    """Polling slows down while nothing changes and after errors."""
+    coordinator = _lists_coordinator(hass)
+    await coordinator.async_refresh()
+    assert coordinator.update_interval == timedelta(
+        seconds=DEFAULT_MIN_SCAN_INTERVAL
+    )
+
+    intervals = []
+    for _ in range(12):
+        await coordinator.async_refresh()
+        intervals.append(coordinator.update_interval.total_seconds())
+    assert intervals[:2] == [
+        DEFAULT_MIN_SCAN_INTERVAL * IDLE_BACKOFF_FACTOR,
+        DEFAULT_MIN_SCAN_INTERVAL * IDLE_BACKOFF_FACTOR**2,
+    ]
+    assert intervals[-1] == DEFAULT_MAX_SCAN_INTERVAL
+
+    # A change brings the interval back down
+    backend.change_random_item()
+    await coordinator.async_refresh()
+    assert coordinator.update_interval == timedelta(
+        seconds=DEFAULT_MIN_SCAN_INTERVAL
+    )
+
+    with patch.object(
+        coordinator.client,
+        "get_lists",
+        side_effect=SmartShoprConnectionError("Connection refused"),
+    ):
+        for errors in range(1, 4):
+            await coordinator.async_refresh()
+            assert not coordinator.last_update_success
+            backoff = DEFAULT_MIN_SCAN_INTERVAL * 2**errors
+            assert (
+                backoff * (1 - ERROR_JITTER)
+                <= coordinator.update_interval.total_seconds()
+                <= backoff * (1 + ERROR_JITTER)
+            )
+
+    await coordinator.async_refresh()
+    assert coordinator.last_update_success
+    assert coordinator._consecutive_errors == 0
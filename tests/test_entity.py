@@ -0,0 +1,58 @@
+"""Tests for the SmartShopr entity lifecycle."""
+from __future__ import annotations
+
+from homeassistant.const import Platform
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers import entity_registry as er
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from benchmarks.fake_server import FakeSmartShoprBackend
+from custom_components.smartshopr.const import DOMAIN
+from custom_components.smartshopr.coordinator import SmartShoprData
+
+
+async def test_entities_follow_lists_and_budgets(
+    recorder_mock: None,
+    hass: HomeAssistant,
+    enable_custom_integrations: None,
+    backend: FakeSmartShoprBackend,
+) -> None:
+    """Entities are added and removed with lists and budgets, without reload."""
+    registry = er.async_get(hass)
+    entry = MockConfigEntry(domain=DOMAIN, data={"api_key": "sk_live_test"})
+    entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+    data: SmartShoprData = hass.data[DOMAIN][entry.entry_id]
+
+    def _entity_id(platform: Platform, unique_id: str) -> str | None:
+        return registry.async_get_entity_id(platform, DOMAIN, unique_id)
+
+    assert _entity_id(Platform.TODO, "smartshopr_list_list-0")
+    list_entity_id = _entity_id(Platform.TODO, "smartshopr_list_list-1")
+    assert list_entity_id
+    budget_entity_id = _entity_id(Platform.SENSOR, "smartshopr_budget_budget-2")
+    assert budget_entity_id
+
+    del backend.lists["list-1"]
+    del backend.items["list-1"]
+    backend.lists["list-2"] = {
+        "id": "list-2",
+        "name": "Hardware store",
+        "shared": False,
+        "version": 1,
+    }
+    backend.items["list-2"] = []
+    del backend.budgets[2]
+    await data.lists.async_refresh()
+    await data.finance.async_refresh()
+    await hass.async_block_till_done()
+
+    assert _entity_id(Platform.TODO, "smartshopr_list_list-1") is None
+    assert hass.states.get(list_entity_id) is None
+    new_entity_id = _entity_id(Platform.TODO, "smartshopr_list_list-2")
+    assert new_entity_id
+    assert hass.states.get(new_entity_id).state == "0"
+    assert _entity_id(Platform.SENSOR, "smartshopr_budget_budget-2") is None
+    assert hass.states.get(budget_entity_id) is None
+    assert await hass.config_entries.async_unload(entry.entry_id)
@@ -0,0 +1,89 @@
+"""Tests for the SmartShopr expense statistics."""
+from __future__ import annotations
+
+from unittest.mock import MagicMock
+
+from homeassistant.core import HomeAssistant
+
+from custom_components.smartshopr.expense_statistics import (
+    SmartShoprStatistics,
+    StatisticSeries,
+)
+from custom_components.smartshopr.models import Budget, MonthlyExpenses
+
+HOUR = 3600
+
+
+def _rows(series: StatisticSeries, before: int) -> list[tuple[float, float]]:
+    """Return the state and sum of the closed rows."""
+    return [(row["state"], row["sum"]) for row in series.pop_closed(before)]
+
+
+def test_first_poll_is_starting_point() -> None:
+    """The value of the first poll is not counted as a change."""
+    series = StatisticSeries("Expenses", "EUR")
+    series.observe(40.0, 0, first=True)
+    assert series.pending == {}
+
+    series.observe(45.5, 0, first=False)
+    series.observe(50.0, HOUR, first=False)
+    assert _rows(series, HOUR) == [(45.5, 5.5)]
+    # The current hour stays pending
+    assert series.pending == {HOUR: [4.5, 50.0]}
+
+
+def test_running_sum() -> None:
+    """Changes are summed per hour and over all imported hours."""
+    series = StatisticSeries("Expenses", "EUR", value=10.0)
+    series.observe(12.0, 0, first=False)
+    series.observe(15.0, 0, first=False)
+    series.observe(15.0, HOUR, first=False)
+    series.observe(20.0, 2 * HOUR, first=False)
+    assert _rows(series, 2 * HOUR) == [(15.0, 5.0)]
+    assert _rows(series, 3 * HOUR) == [(20.0, 10.0)]
+
+
+def test_month_change() -> None:
+    """A new period counts from zero, even if the value did not drop."""
+    series = StatisticSeries("Expenses", "EUR", value=30.0)
+    series.observe(35.0, 0, first=False, new_period=True)
+    assert _rows(series, HOUR) == [(35.0, 35.0)]
+
+    # Without expenses in the new month the state still shows the reset
+    series.observe(0.0, HOUR, first=False, new_period=True)
+    assert _rows(series, 2 * HOUR) == [(0.0, 35.0)]
+
+
+def test_drop_is_reset() -> None:
+    """A lower value is counted from zero, without a new period."""
+    series = StatisticSeries("Budget", "EUR", value=80.0)
+    series.observe(12.0, 0, first=False)
+    series.observe(20.0, 0, first=False)
+    assert _rows(series, HOUR) == [(20.0, 20.0)]
+
+
+def test_new_currency() -> None:
+    """A series appearing after the first poll counts from zero."""
+    series = StatisticSeries("Expenses USD", "USD")
+    series.observe(7.25, 0, first=False)
+    assert _rows(series, HOUR) == [(7.25, 7.25)]
+
+
+async def test_new_month_keeps_budgets(hass: HomeAssistant) -> None:
+    """A new expenses month resets the expenses, not the budgets."""
+    coordinator = MagicMock(last_update_success=True)
+    statistics = SmartShoprStatistics(hass, "entry", coordinator)
+
+    def _poll(month: str, total: float, spent: float) -> None:
+        coordinator.data = {
+            "expenses": MonthlyExpenses(month=month, totals={"EUR": total}),
+            "budgets": [Budget(id="b1", name="Food", spent=spent)],
+        }
+        statistics._async_observe()
+
+    _poll("2026-09", 100.0, 60.0)
+    _poll("2026-10", 5.0, 65.0)
+    expenses = statistics._series["smartshopr:entry_expenses_eur"]
+    budget = statistics._series["smartshopr:entry_budget_b1"]
+    assert [change for change, _ in expenses.pending.values()] == [5.0]
+    assert [change for change, _ in budget.pending.values()] == [5.0]
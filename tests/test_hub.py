@@ -0,0 +1,78 @@
+"""Tests for the SmartShopr shared list hub."""
+from __future__ import annotations
+
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+
+from benchmarks.fake_server import FakeSmartShoprBackend
+from custom_components.smartshopr import hub
+from custom_components.smartshopr.api import SmartShoprApiClient
+from custom_components.smartshopr.const import SHARED_LIST_REUSE_WINDOW
+from custom_components.smartshopr.coordinator import SmartShoprListsCoordinator
+from custom_components.smartshopr.hub import SmartShoprSharedListHub
+from custom_components.smartshopr.models import ListItem
+
+ITEMS = (ListItem(id="i1", name="Milk", quantity_value=1),)
+
+
+async def test_shared_list_fetched_once(
+    hass: HomeAssistant, backend: FakeSmartShoprBackend
+) -> None:
+    """Entries refreshing together fetch a shared list once."""
+    shared_lists = SmartShoprSharedListHub()
+    session = async_get_clientsession(hass)
+    coordinators = [
+        SmartShoprListsCoordinator(
+            hass, SmartShoprApiClient(api_key, session), shared_lists=shared_lists
+        )
+        for api_key in ("sk_live_one", "sk_live_two")
+    ]
+    await asyncio.gather(
+        *(coordinator.async_refresh() for coordinator in coordinators)
+    )
+
+    # list-0 is shared, list-1 is fetched by both entries
+    assert backend.stats.by_endpoint["lists/{id}/items"] == 3 + 2 * 3
+    assert shared_lists.fetches == 1
+    assert shared_lists.reused == 1
+    first, second = (
+        coordinator.data["lists_by_id"]["list-0"].items
+        for coordinator in coordinators
+    )
+    assert len(first) == 450
+    assert first is second
+
+
+async def test_reuse_by_marker() -> None:
+    """Items are reused while the marker is the same."""
+    shared_lists = SmartShoprSharedListHub()
+    fetch = AsyncMock(return_value=ITEMS)
+    assert await shared_lists.async_get_items("l1", "v1", fetch) is ITEMS
+    assert await shared_lists.async_get_items("l1", "v1", fetch) is ITEMS
+    assert fetch.await_count == 1
+
+    await shared_lists.async_get_items("l1", "v2", fetch)
+    assert fetch.await_count == 2
+    assert shared_lists.as_diagnostics() == {
+        "cached_lists": 1,
+        "fetches": 2,
+        "reused": 1,
+    }
+
+
+async def test_reuse_without_marker() -> None:
+    """Items of lists without marker are reused for a short time."""
+    shared_lists = SmartShoprSharedListHub()
+    fetch = AsyncMock(return_value=ITEMS)
+    with patch.object(hub, "time") as mock_time:
+        mock_time.monotonic.return_value = 1000.0
+        await shared_lists.async_get_items("l1", None, fetch)
+        await shared_lists.async_get_items("l1", None, fetch)
+        assert fetch.await_count == 1
+
+        mock_time.monotonic.return_value = 1000.0 + SHARED_LIST_REUSE_WINDOW
+        await shared_lists.async_get_items("l1", None, fetch)
+        assert fetch.await_count == 2
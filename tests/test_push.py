@@ -0,0 +1,42 @@
+"""Tests for the SmartShopr push listener."""
+from __future__ import annotations
+
+import json
+from unittest.mock import MagicMock
+
+from homeassistant.core import HomeAssistant
+
+from custom_components.smartshopr.models import ListItem
+from custom_components.smartshopr.push import EVENT_ITEM_UPDATED, SmartShoprPushListener
+
+
+async def test_ignores_events_that_are_not_objects(
+    hass: HomeAssistant, client: MagicMock, coordinator: MagicMock
+) -> None:
+    """Valid JSON that is not an object is ignored."""
+    listener = SmartShoprPushListener(hass, client, coordinator)
+    for data in ("[1]", '"x"', "null", "{"):
+        listener._handle_message(data)
+    assert listener.events_received == 0
+    coordinator.async_request_refresh.assert_not_called()
+
+
+async def test_pushed_item_keeps_waiting_writes(
+    hass: HomeAssistant, client: MagicMock, coordinator: MagicMock
+) -> None:
+    """Pushed items are shown with the waiting writes applied."""
+    coordinator.data = {"lists_by_id": {"l1": MagicMock()}}
+    listener = SmartShoprPushListener(hass, client, coordinator)
+    listener._handle_message(
+        json.dumps(
+            {
+                "type": EVENT_ITEM_UPDATED,
+                "list_id": "l1",
+                "item": {"id": "i1", "name": "Milk", "is_completed": True},
+            }
+        )
+    )
+    coordinator.write_queue.async_show_item.assert_called_once_with(
+        "l1", ListItem(id="i1", name="Milk", is_completed=True)
+    )
+    coordinator.async_upsert_item.assert_not_called()
@@ -0,0 +1,64 @@
+"""Tests for the SmartShopr rate limiter and shared tasks."""
+from __future__ import annotations
+
+import asyncio
+import time
+
+import pytest
+
+from custom_components.smartshopr.resilience import SharedTasks, TokenBucket
+
+
+async def test_rate_limit_only_after_engage() -> None:
+    """Requests are only limited after the server rejected one."""
+    bucket = TokenBucket(rate=100, capacity=1, hold=60)
+    start = time.monotonic()
+    for _ in range(50):
+        await bucket.acquire()
+    assert time.monotonic() - start < 0.1
+    assert not bucket.active
+
+    bucket.engage()
+    assert bucket.active
+    start = time.monotonic()
+    for _ in range(5):
+        await bucket.acquire()
+    # Starts empty, every request waits for its token
+    assert time.monotonic() - start >= 0.045
+
+
+async def test_shared_task_cancelled_with_last_caller() -> None:
+    """A shared task runs while any caller waits, and stops after that."""
+    started = 0
+    release = asyncio.Event()
+
+    async def fetch() -> int:
+        nonlocal started
+        started += 1
+        await release.wait()
+        return started
+
+    shared: SharedTasks[int] = SharedTasks()
+    first = asyncio.ensure_future(shared.async_run("key", fetch))
+    second = asyncio.ensure_future(shared.async_run("key", fetch))
+    await asyncio.sleep(0)
+    assert "key" in shared
+
+    first.cancel()
+    await asyncio.sleep(0)
+    release.set()
+    assert await second == 1
+    with pytest.raises(asyncio.CancelledError):
+        await first
+
+    release.clear()
+    third = asyncio.ensure_future(shared.async_run("key", fetch))
+    await asyncio.sleep(0)
+    (task,) = shared._tasks.values()
+    third.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await third
+    await asyncio.sleep(0)
+    assert task.cancelled()
+    assert "key" not in shared
+    assert started == 2
@@ -0,0 +1,48 @@
+"""Tests for the SmartShopr sensors."""
+from __future__ import annotations
+
+from homeassistant.const import Platform
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers import entity_registry as er
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from benchmarks.fake_server import FakeSmartShoprBackend
+from custom_components.smartshopr.const import DOMAIN
+
+
+async def test_diagnostic_sensors_per_entry(
+    recorder_mock: None,
+    hass: HomeAssistant,
+    enable_custom_integrations: None,
+    backend: FakeSmartShoprBackend,
+) -> None:
+    """Every config entry has its own diagnostic sensors."""
+    registry = er.async_get(hass)
+    first = MockConfigEntry(domain=DOMAIN, data={"api_key": "sk_live_first"})
+    second = MockConfigEntry(domain=DOMAIN, data={"api_key": "sk_live_second"})
+    first.add_to_hass(hass)
+    second.add_to_hass(hass)
+    # Registered by an earlier version, without the entry id
+    old = registry.async_get_or_create(
+        Platform.SENSOR,
+        DOMAIN,
+        "smartshopr_pending_writes",
+        config_entry=first,
+        suggested_object_id="smartshopr_pending_writes",
+    )
+
+    # Sets up both entries
+    assert await hass.config_entries.async_setup(first.entry_id)
+    await hass.async_block_till_done()
+
+    for entry in (first, second):
+        for key in ("last_refresh_duration", "requests_per_refresh", "pending_writes"):
+            assert registry.async_get_entity_id(
+                Platform.SENSOR, DOMAIN, f"smartshopr_{entry.entry_id}_{key}"
+            )
+    assert (
+        registry.async_get_entity_id(
+            Platform.SENSOR, DOMAIN, f"smartshopr_{first.entry_id}_pending_writes"
+        )
+        == old.entity_id
+    )
@@ -0,0 +1,196 @@
+"""Tests for the SmartShopr write queue."""
+from __future__ import annotations
+
+from datetime import timedelta
+from typing import Any
+from unittest.mock import MagicMock, call, patch
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.util import dt as dt_util
+from pytest_homeassistant_custom_component.common import (
+    async_fire_time_changed_exact,
+)
+
+from benchmarks.fake_server import FakeSmartShoprBackend
+from custom_components.smartshopr.api import SmartShoprApiClient, SmartShoprRequestError
+from custom_components.smartshopr.const import (
+    DOMAIN,
+    STORAGE_VERSION,
+    WRITE_COALESCE_WINDOW,
+)
+from custom_components.smartshopr.coordinator import SmartShoprListsCoordinator
+from custom_components.smartshopr.write_queue import (
+    OP_ADD,
+    OP_DELETE,
+    OP_UPDATE,
+    PENDING_ID_PREFIX,
+    PendingWrite,
+    SmartShoprWriteQueue,
+    compact,
+)
+
+
+def _write(op: str, item_id: str, **fields: Any) -> PendingWrite:
+    """Return a write to the list l1."""
+    return PendingWrite(
+        key=f"{op}-{item_id}", op=op, list_id="l1", item_id=item_id, fields=fields
+    )
+
+
+def test_compact_merges_updates() -> None:
+    """Updates of the same item are merged into the last one."""
+    entries = compact(
+        [
+            _write(OP_UPDATE, "i1", is_completed=True),
+            _write(OP_UPDATE, "i2", name="Bread"),
+            _write(OP_UPDATE, "i1", quantity_value=2),
+        ]
+    )
+    assert [(entry.item_id, entry.fields) for entry in entries] == [
+        ("i2", {"name": "Bread"}),
+        ("i1", {"is_completed": True, "quantity_value": 2}),
+    ]
+
+
+def test_compact_delete_cancels_updates() -> None:
+    """A delete replaces the earlier updates of the item."""
+    entries = compact(
+        [_write(OP_UPDATE, "i1", is_completed=True), _write(OP_DELETE, "i1")]
+    )
+    assert [(entry.op, entry.item_id) for entry in entries] == [(OP_DELETE, "i1")]
+
+
+def test_compact_add_and_delete() -> None:
+    """An item added and deleted again is not sent at all."""
+    pending = f"{PENDING_ID_PREFIX}1"
+    entries = compact(
+        [
+            _write(OP_ADD, pending, name="Eggs"),
+            _write(OP_UPDATE, pending, quantity_value=2),
+            _write(OP_UPDATE, "i1", is_completed=True),
+            _write(OP_DELETE, pending),
+        ]
+    )
+    assert [(entry.op, entry.item_id) for entry in entries] == [(OP_UPDATE, "i1")]
+
+
+async def test_replay_order(
+    hass: HomeAssistant, client: MagicMock, coordinator: MagicMock
+) -> None:
+    """Writes are sent in order, with the id of the added item."""
+    queue = SmartShoprWriteQueue(hass, "entry", client, coordinator)
+    item = await queue.async_add_item("l1", "Eggs", 1)
+    await queue.async_update_item("l1", item.id, quantity_value=2)
+    await queue.async_update_item("l1", "i1", is_completed=True)
+    await queue.async_delete_items("l1", ["i2"])
+    await queue.async_drain()
+
+    assert client.add_item.await_count == 1
+    assert client.update_items.await_args_list == [
+        call({"id-Eggs": {"quantity_value": 2}, "i1": {"is_completed": True}})
+    ]
+    assert client.delete_items.await_args_list == [call(["i2"])]
+    assert queue.depth == 0
+    assert queue.sent == 4
+
+
+async def test_add_without_item(
+    hass: HomeAssistant, client: MagicMock, coordinator: MagicMock
+) -> None:
+    """Writes to an item whose add returns no item are dropped."""
+    client.add_item.side_effect = None
+    client.add_item.return_value = None
+    queue = SmartShoprWriteQueue(hass, "entry", client, coordinator)
+    item = await queue.async_add_item("l1", "Eggs", 1)
+    await queue.async_update_item("l1", item.id, quantity_value=2)
+    await queue.async_delete_items("l1", ["i2"])
+    await queue.async_drain()
+
+    assert queue.depth == 0
+    assert queue.dropped == 1
+    client.add_item.assert_awaited_once()
+    client.update_items.assert_not_awaited()
+    assert client.delete_items.await_args_list == [call(["i2"])]
+
+
+async def test_stored_write_of_missing_add(
+    hass: HomeAssistant,
+    hass_storage: dict[str, Any],
+    client: MagicMock,
+    coordinator: MagicMock,
+) -> None:
+    """A stored write to an item that was never created is dropped."""
+    pending = f"{PENDING_ID_PREFIX}1"
+    hass_storage[f"{DOMAIN}.entry.write_queue"] = {
+        "version": STORAGE_VERSION,
+        "key": f"{DOMAIN}.entry.write_queue",
+        "data": {
+            "entries": [
+                _write(OP_UPDATE, pending, quantity_value=2).as_dict(),
+                _write(OP_UPDATE, "i1", is_completed=True).as_dict(),
+            ]
+        },
+    }
+    queue = SmartShoprWriteQueue(hass, "entry", client, coordinator)
+    await queue.async_load()
+    queue.async_schedule_replay()
+    await queue.async_drain()
+
+    assert queue.depth == 0
+    assert queue.dropped == 1
+    assert client.update_items.await_args_list == [call({"i1": {"is_completed": True}})]
+
+
+async def test_rejected_write_rolled_back(
+    hass: HomeAssistant, backend: FakeSmartShoprBackend
+) -> None:
+    """The items of a list are fetched again after a write was rejected."""
+    client = SmartShoprApiClient("sk_live_test", async_get_clientsession(hass))
+    coordinator = SmartShoprListsCoordinator(hass, client)
+    queue = SmartShoprWriteQueue(hass, "entry", client, coordinator)
+    coordinator.write_queue = queue
+    await coordinator.async_refresh()
+    item = next(item for item in backend.items["list-0"] if not item["is_completed"])
+    item_id = item["id"]
+
+    with patch.object(
+        client,
+        "update_items",
+        return_value={item_id: SmartShoprRequestError("Access denied", 403)},
+    ):
+        await queue.async_update_item("list-0", item_id, is_completed=True)
+        assert coordinator.data["items_by_id"][item_id].is_completed
+        await queue.async_drain()
+    await hass.async_block_till_done()
+    await coordinator.async_refresh()
+
+    assert queue.dropped == 1
+    assert not coordinator.data["items_by_id"][item_id].is_completed
+    assert not item["is_completed"]
+
+
+async def test_quick_writes_coalesced(
+    hass: HomeAssistant, client: MagicMock, coordinator: MagicMock
+) -> None:
+    """Writes issued within the coalesce window are sent in one request."""
+    queue = SmartShoprWriteQueue(hass, "entry", client, coordinator)
+    for completed in (True, False, True, False):
+        await queue.async_update_item("l1", "i1", is_completed=completed)
+        await queue.async_update_item("l1", "i2", name=f"Bread {completed}")
+        async_fire_time_changed_exact(
+            hass, dt_util.utcnow() + timedelta(seconds=WRITE_COALESCE_WINDOW / 2)
+        )
+        await hass.async_block_till_done()
+    client.update_items.assert_not_awaited()
+
+    async_fire_time_changed_exact(
+        hass, dt_util.utcnow() + timedelta(seconds=WRITE_COALESCE_WINDOW)
+    )
+    await hass.async_block_till_done()
+    await queue.async_drain()
+
+    assert client.update_items.await_args_list == [
+        call({"i1": {"is_completed": False}, "i2": {"name": "Bread False"}})
+    ]
+    assert queue.depth == 0